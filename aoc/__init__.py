@@ -1,4 +1,10 @@
 from aoc.api import *
 from aoc.helpers import *
+from aoc.grid import *
+from aoc.graph import *
+from aoc.ranges import *
+from aoc.automaton import *
+from aoc.stream import *
+from aoc.bits import *
 from aoc import template
 from aoc.types import *
\ No newline at end of file
@@ -1,27 +1,38 @@
 __all__ = [
+    'InputStore',
+    'Ledger',
     'Puzzle',
     'get_aoc_session',
     'register_aoc_session',
 ]
 
 
-from bs4 import BeautifulSoup
+from aoc.lazy import LazyModule
+from aoc.stream import InputStream
 from datetime import datetime
-from zoneinfo import ZoneInfo
-import colorful as cf
-import logging
+from functools import cached_property
+import math
+import mmap
 import os
-import requests
+import re
+import shutil
+import tempfile
+import time
 import warnings
 
+# These are slow to import, and only needed once we actually talk to the server
+cf = LazyModule('colorful')
+html = LazyModule('html')
+json = LazyModule('json')
+logging = LazyModule('logging')
+requests = LazyModule('requests')
+zoneinfo = LazyModule('zoneinfo')
 
-logging.basicConfig(format='[%(levelname)s] %(message)s')
-log = logging.getLogger(__name__)
-
-# Advent of Code begins at midnight EST
-current_time = datetime.now(ZoneInfo('US/Eastern'))
 aoc_url = 'https://adventofcode.com'
 aoc_session_path = os.path.expanduser('~/.config/aoc/.aoc_session')
+# Inputs used to be cached as this file in whichever directory the script ran in
+legacy_input_template = 'input-%(year)04d-day%(day)02d.txt'
+aoc_cache_dir = os.path.expanduser(os.environ.get('AOC_CACHE_DIR', '~/.cache/aoc'))
 
 def get_aoc_session():
     try:
@@ -46,6 +57,15 @@ def register_aoc_session(session):
     with open(aoc_session_path, 'w') as f:
         f.write(session)
 
+def get_current_time():
+    """Advent of Code begins at midnight EST."""
+    return datetime.now(zoneinfo.ZoneInfo('US/Eastern'))
+
+def get_logger():
+    # basicConfig() is a no-op once the root logger has been configured
+    logging.basicConfig(format='[%(levelname)s] %(message)s')
+    return logging.getLogger(__name__)
+
 def coerce(val):
     """Used internally by Puzzle.submit() to coerce non-str values upon submitting"""
     if isinstance(val, int):
@@ -55,17 +75,287 @@ def coerce(val):
     return val
 
 
+def make_req_session(session, pool_size=None):
+    """Create an authenticated requests.Session, optionally with a larger connection pool."""
+    req_session = requests.Session()
+    req_session.cookies['session'] = session
+    req_session.headers['User-Agent'] = 'aoc-tools by hlyndon20@gmail.com'
+    if pool_size is not None:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        req_session.mount('https://', adapter)
+    return req_session
+
+def capture_answer(answer):
+    """Record the answer to the file named by AOC_CAPTURE (used by `aoc bench`), if it is set."""
+    path = os.environ.get('AOC_CAPTURE')
+    if not path:
+        return False
+    with open(path, 'w') as f:
+        f.write('' if answer is None else coerce(answer))
+    return True
+
+def fetch_input(req_session, year, day):
+    """Download the raw input for a given year/day, raising AOCError on failure."""
+    aoc_input_url = f'{aoc_url}/{year}/day/{day}/input'
+    resp = req_session.get(aoc_input_url)
+    match resp.status_code:
+        case 302:
+            raise AOCError(f'Your session token has likely expired.')
+        case 404:
+            raise AOCError(f"Input data not found. Check if your day's puzzle is correct.")
+        case 400:
+            raise AOCError('Failed to fetch input data. Perhaps your session token is invalid?')
+        case code if code != 200:
+            raise AOCError(f'Failed to fetch input data (HTTP {resp.status_code}).')
+    return resp.text
+
+
+article_pattern = re.compile(r'<article[^>]*>(.*?)</article>', re.S)
+wrong_wait_pattern = re.compile(r'wait (one|\d+) minutes? before trying again', re.I)
+recent_wait_pattern = re.compile(r'You have (?:(\d+)m )?(\d+)s left to wait')
+
+def parse_response(page):
+    """Classify the server's response to a submission, without building an HTML tree.
+
+    Returns (message, outcome, hint, wait): outcome is one of 'right', 'wrong', 'wait', 'solved'
+    or None (unrecognized), hint is 'high'/'low' if the server said so, and wait is the number
+    of seconds to wait before the next submission.
+    """
+    m = article_pattern.search(page)
+    message = html.unescape(re.sub(r'<[^>]*>', '', m[1] if m else page)).strip()
+    outcome = hint = None
+    wait = 0
+    if "That's the right answer" in message:
+        outcome = 'right'
+    elif "That's not the right answer" in message:
+        outcome = 'wrong'
+        if 'answer is too high' in message:
+            hint = 'high'
+        elif 'answer is too low' in message:
+            hint = 'low'
+        m = wrong_wait_pattern.search(message)
+        if m is not None:
+            wait = 60 * (1 if m[1] == 'one' else int(m[1]))
+    elif 'You gave an answer too recently' in message:
+        outcome = 'wait'
+        m = recent_wait_pattern.search(message)
+        if m is not None:
+            wait = 60 * int(m[1] or 0) + int(m[2])
+    elif "You don't seem to be solving the right level" in message:
+        outcome = 'solved'
+    return message, outcome, hint, wait
+
+
 class AOCError(Exception):
     pass
 
 
+class Ledger:
+    """A persistent record of every answer submitted for a puzzle, and the server's verdicts.
+
+    It rules out answers locally: ones already rejected, ones contradicting a 'too high/low'
+    hint, and anything but the accepted answer once a part is solved. It also remembers when
+    the server will accept the next submission.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+        self.locked_until = 0
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.entries = saved.get('entries', [])
+        self.locked_until = saved.get('locked_until', 0)
+
+    def check(self, part, answer):
+        """Return why the answer to this part can be ruled out without submitting, if it can."""
+        number = int(answer) if re.fullmatch(r'-?\d+', answer) else None
+        low = high = None
+        for entry in self.entries:
+            if entry['part'] != part:
+                continue
+            if entry['outcome'] == 'right':
+                if entry['answer'] == answer:
+                    return 'this answer was already accepted'
+                return f'this part was already solved with {entry["answer"]}'
+            if entry['answer'] == answer:
+                return 'this answer was already rejected'
+            if number is None or not re.fullmatch(r'-?\d+', entry['answer']):
+                continue
+            if entry['hint'] == 'low' and (low is None or int(entry['answer']) > low):
+                low = int(entry['answer'])
+            elif entry['hint'] == 'high' and (high is None or int(entry['answer']) < high):
+                high = int(entry['answer'])
+        if number is not None and low is not None and number <= low:
+            return f'{low} was already too low'
+        if number is not None and high is not None and number >= high:
+            return f'{high} was already too high'
+        return None
+
+    def record(self, part, answer, outcome, hint=None, wait=0):
+        self.entries.append({
+            'part': part,
+            'answer': answer,
+            'outcome': outcome,
+            'hint': hint,
+            'time': time.time(),
+        })
+        self.lock(wait)
+
+    def lock(self, wait):
+        self.locked_until = max(self.locked_until, time.time() + wait)
+        self.save()
+
+    def wait(self):
+        """Sleep until the server accepts submissions again, with a countdown."""
+        waited = False
+        while (left := self.locked_until - time.time()) > 0:
+            print(f'\rWaiting {math.ceil(left)}s before submitting... ', end='', flush=True)
+            time.sleep(min(left, 1))
+            waited = True
+        if waited:
+            print()
+
+    def save(self):
+        dirname = os.path.dirname(self.path)
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'entries': self.entries, 'locked_until': self.locked_until}, f,
+                          indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class InputStore:
+    """A cache of puzzle inputs on disk, keyed by year/day.
+
+    Reads are memoized for the lifetime of the process, large files are read through mmap, and
+    writes are atomic (temp file + rename), so an interrupted fetch never leaves a truncated input.
+    """
+
+    input_template = '%(year)04d/day%(day)02d.txt'
+    ledger_template = '%(year)04d/day%(day)02d.ledger.json'
+    input_pattern = re.compile(r'(\d{4})/day(\d{2})\.txt')
+    mmap_threshold = 1 << 20
+
+    def __init__(self, root=aoc_cache_dir):
+        self.root = root
+        self.memo = {}
+
+    def path(self, year, day):
+        return os.path.join(self.root, self.input_template % {'year': year, 'day': day})
+
+    def ledger_path(self, year, day):
+        return os.path.join(self.root, self.ledger_template % {'year': year, 'day': day})
+
+    def __contains__(self, key):
+        """Whether get() would find the input: empty files (e.g. from an interrupted write by an
+        older version) don't count, so that `aoc fetch` downloads them again."""
+        year, day = key
+        if key in self.memo:
+            return True
+        try:
+            return os.stat(self.path(year, day)).st_size > 0
+        except OSError:
+            return False
+
+    def get(self, year, day):
+        """Return the cached input for year/day, or None if it is missing or empty."""
+        key = (year, day)
+        if key in self.memo:
+            return self.memo[key]
+        try:
+            with open(self.path(year, day), 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return None
+                if size >= self.mmap_threshold:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        data = str(mm, 'utf-8')
+                else:
+                    data = f.read().decode()
+        except OSError:
+            return None
+        self.memo[key] = data
+        return data
+
+    def put(self, year, day, data):
+        """Atomically write the input for year/day into the cache, returning its path."""
+        path = self.path(year, day)
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data.encode())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.memo[year, day] = data
+        return path
+
+    def list(self):
+        """Return a sorted list of the (year, day) pairs that are cached."""
+        result = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                relpath = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                m = self.input_pattern.fullmatch(relpath.replace(os.sep, '/'))
+                if m is not None:
+                    result.append((int(m[1]), int(m[2])))
+        return sorted(result)
+
+    def verify(self):
+        """Return a list of (year, day, problem) for every cached input that looks corrupted."""
+        problems = []
+        for year, day in self.list():
+            try:
+                with open(self.path(year, day), 'rb') as f:
+                    raw = f.read()
+            except OSError as e:
+                problems.append((year, day, str(e)))
+                continue
+            if not raw:
+                problems.append((year, day, 'file is empty'))
+            elif not raw.endswith(b'\n'):
+                problems.append((year, day, 'missing trailing newline (possibly truncated)'))
+            else:
+                try:
+                    raw.decode()
+                except UnicodeDecodeError:
+                    problems.append((year, day, 'not valid UTF-8'))
+        return problems
+
+    def export(self, dest, template=legacy_input_template):
+        """Copy every cached input into dest (flat, named by template), returning the new paths."""
+        os.makedirs(dest, exist_ok=True)
+        paths = []
+        for year, day in self.list():
+            path = os.path.join(dest, template % {'year': year, 'day': day})
+            shutil.copyfile(self.path(year, day), path)
+            paths.append(path)
+        return paths
+
+
+default_store = InputStore()
+
+
 class Puzzle:
-    cached_input_template = 'input-%(year)04d-day%(day)02d.txt'
     part1_done_dir = '.finished-part1'
 
-    def __init__(self, year=None, day=None, session=None,
-                 cached_input_template=cached_input_template):
+    def __init__(self, year=None, day=None, session=None, store=None):
         # If no year/day is specified, assume the current time
+        current_time = get_current_time()
         if year is None:
             year = current_time.year
         if day is None:
@@ -81,46 +371,47 @@ class Puzzle:
         self.day = day
         self.year = year
         self.session = session
-        self.cached_input_template = cached_input_template
+        self.store = store if store is not None else default_store
 
-        self.req_session = requests.Session()
-        self.req_session.cookies['session'] = self.session
-        self.req_session.headers['User-Agent'] = 'aoc-tools by hlyndon20@gmail.com'
+    @cached_property
+    def ledger(self):
+        return Ledger(self.store.ledger_path(self.year, self.day))
+
+    @cached_property
+    def req_session(self):
+        return make_req_session(self.session)
 
     @property
     def data(self):
-        mapping = {'year': self.year, 'day': self.day}
-        cached_input_filename = self.cached_input_template % mapping
+        # Attempt to read from the cache first, to avoid extra requests
+        data = self.store.get(self.year, self.day)
+        if data is not None:
+            return data
+
+        # Pick up inputs cached the old way in the current directory
+        legacy_filename = legacy_input_template % {'year': self.year, 'day': self.day}
         try:
-            # Attempt to read from the cached file first, to avoid extra requests
-            with open(cached_input_filename, 'r') as f:
+            with open(legacy_filename, 'r') as f:
                 data = f.read()
-            is_cached = len(data) != 0
         except OSError:
-            is_cached = False
-
-        if not is_cached:
-            aoc_input_url = f'{aoc_url}/{self.year}/day/{self.day}/input'
-            resp = self.req_session.get(aoc_input_url)
-            match resp.status_code:
-                case 302:
-                    raise AOCError(f'Your session token has likely expired.')
-                case 404:
-                    raise AOCError(f"Input data not found. Check if your day's puzzle is correct.")
-                case 400:
-                    raise AOCError('Failed to fetch input data. Perhaps your session token is invalid?')
-                case code if code != 200:
-                    raise AOCError(f'Failed to fetch input data (HTTP {resp.status_code}).')
-
-            data = resp.text
-            with open(cached_input_filename, 'w') as f:
-                log.warning(f'Input for day {self.day} is not cached, saving data to {cached_input_filename!r}...')
-                f.write(data)
+            data = None
 
+        if not data:
+            data = fetch_input(self.req_session, self.year, self.day)
+            path = self.store.path(self.year, self.day)
+            get_logger().warning(f'Input for day {self.day} is not cached, saving data to {path!r}...')
+        self.store.put(self.year, self.day, data)
         return data
 
+    def stream(self):
+        """Read the input lazily from the cache in constant memory, for huge inputs."""
+        path = self.store.path(self.year, self.day)
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            self.data
+        return InputStream.from_path(path)
+
     def submit(self, answer, part=None):
-        if answer is None:
+        if capture_answer(answer) or answer is None:
             exit()
 
         if part is None:
@@ -133,6 +424,12 @@ class Puzzle:
             raise AOCError(f'Cowardly refusing to submit non-answer: {answer!r}')
         answer = coerce(answer)
 
+        # Answers that are known to be wrong never need a round trip to the server
+        reason = self.ledger.check(part, answer)
+        if reason is not None:
+            print(cf.red(f'Not submitting {answer}: {reason}.'))
+            exit()
+
         prompt = input(cf.white(f'Are you sure you want to submit [y/N]: {answer}\n>>> '))
         if prompt != 'y':
             exit()
@@ -142,18 +439,26 @@ class Puzzle:
             'level': part,
             'answer': answer,
         }
-        resp = self.req_session.post(aoc_submit_url, data=data)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        message = soup.article.text
+        while True:
+            self.ledger.wait()
+            resp = self.req_session.post(aoc_submit_url, data=data)
+            message, outcome, hint, wait = parse_response(resp.text)
+            if outcome != 'wait':
+                break
+            # Locked out by an earlier submission: retry as soon as the server allows it
+            print(cf.yellow(message))
+            self.ledger.lock(wait or 60)
 
-        if "That's the right answer" in message:
+        if outcome == 'right':
             print(cf.green(message))
             if not os.path.isdir(self.part1_done_dir):
                 os.mkdir(self.part1_done_dir)
-        elif "That's not the right answer" in message:
+        elif outcome == 'wrong':
             print(cf.red(message))
         else:
             print(cf.yellow(message))
+        if outcome in ('right', 'wrong'):
+            self.ledger.record(part, answer, outcome, hint, wait)
         exit()
 
     __call__ = submit
\ No newline at end of file
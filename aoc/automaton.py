@@ -0,0 +1,161 @@
+__all__ = [
+    'Automaton',
+    'neighbor_counts',
+    'to_array',
+]
+
+
+from aoc.helpers import D8
+
+
+def get_numpy():
+    """Returns the numpy module, or None if it isn't installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def grid_rows(grid):
+    """The rows of a grid-like value (a str, Grid, or list of rows) as bytes objects."""
+    if isinstance(grid, str):
+        grid = grid.rstrip('\n').split('\n')
+    if hasattr(grid, 'row') and hasattr(grid, 'height'):
+        return [bytes(grid.row(r)) for r in range(grid.height)]
+    return [row if isinstance(row, bytes) else ''.join(row).encode('latin-1') for row in grid]
+
+
+def to_array(grid):
+    """Convert a grid (a str, Grid, xstr.grid or list of rows) into a 2D NumPy uint8 array of
+    the cells' byte values, e.g. to_array(grid) == ord('#')."""
+    np = get_numpy()
+    if np is None:
+        raise ImportError('to_array() requires NumPy to be installed')
+    rows = grid_rows(grid)
+    return np.frombuffer(b''.join(rows), dtype=np.uint8).reshape(len(rows), len(rows[0])).copy()
+
+
+def neighbor_counts(cells, moves=D8, out=None):
+    """Count the live neighbours of every cell of a 2D 0/1 NumPy array (cells outside are dead).
+
+    This is a convolution with the kernel given by moves (e.g. D4 or D8), done as one shifted
+    in-place add per move. Pass out to reuse a buffer between generations.
+    """
+    np = get_numpy()
+    height, width = cells.shape
+    padded = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = cells
+    if out is None:
+        out = np.zeros((height, width), dtype=np.uint8)
+    else:
+        out.fill(0)
+    for dr, dc in moves:
+        np.add(out, padded[1 + dr:1 + dr + height, 1 + dc:1 + dc + width], out=out)
+    return out
+
+
+class Automaton:
+    """A cellular automaton with a Life-like rule on a bounded 2D grid.
+
+    A dead cell becomes alive with a neighbour count in born, and a live cell stays alive with a
+    neighbour count in survive. Neighbours are given by moves (D8 by default, or D4), and cells
+    outside the grid count as dead. With NumPy installed (backend='numpy', or 'auto'), a
+    generation is a handful of vectorized operations on preallocated buffers, otherwise a pure
+    Python loop over a flat, padded bytearray is used.
+    """
+
+    def __init__(self, grid, alive='#', born=(3,), survive=(2, 3), moves=D8, backend='auto'):
+        rows = grid_rows(grid)
+        self.height = len(rows)
+        self.width = len(rows[0])
+        self.alive = alive
+        self.moves = moves
+        self.born = frozenset(born)
+        self.survive = frozenset(survive)
+        self.generation = 0
+
+        np = get_numpy() if backend in ('auto', 'numpy') else None
+        if backend == 'numpy' and np is None:
+            raise ImportError("backend='numpy' requires NumPy to be installed")
+        if backend not in ('auto', 'numpy', 'python'):
+            raise ValueError("backend must be one of 'auto', 'numpy' or 'python'")
+        self.np = np
+
+        alive_byte = ord(alive)
+        # The next state of a cell is table[9 * state + count]
+        table = [0] * 18
+        for n in range(9):
+            table[n] = int(n in self.born)
+            table[9 + n] = int(n in self.survive)
+
+        height, width = self.height, self.width
+        if np is not None:
+            self.backend = 'numpy'
+            self.table = np.array(table, dtype=np.uint8)
+            # Two padded boards that are swapped every generation, plus scratch buffers
+            self.board = np.zeros((height + 2, width + 2), dtype=np.uint8)
+            self.spare = np.zeros_like(self.board)
+            self.board[1:-1, 1:-1] = to_array(rows) == alive_byte
+            self.counts = np.zeros((height, width), dtype=np.uint8)
+            self.index = np.zeros((height, width), dtype=np.intp)
+        else:
+            self.backend = 'python'
+            self.table = bytes(table)
+            stride = width + 2
+            self.board = bytearray(stride * (height + 2))
+            for r, row in enumerate(rows):
+                start = (r + 1) * stride + 1
+                self.board[start:start + width] = bytes(b == alive_byte for b in row)
+            self.spare = bytearray(len(self.board))
+            self.deltas = [dr * stride + dc for dr, dc in moves]
+
+    def step(self, n=1):
+        """Advance the automaton by n generations."""
+        for _ in range(n):
+            if self.np is not None:
+                self.step_numpy()
+            else:
+                self.step_python()
+            self.board, self.spare = self.spare, self.board
+            self.generation += 1
+        return self
+
+    def step_numpy(self):
+        np = self.np
+        height, width = self.height, self.width
+        board, counts, index = self.board, self.counts, self.index
+        counts.fill(0)
+        for dr, dc in self.moves:
+            np.add(counts, board[1 + dr:1 + dr + height, 1 + dc:1 + dc + width], out=counts)
+        np.multiply(board[1:-1, 1:-1], 9, out=index)
+        np.add(index, counts, out=index)
+        np.take(self.table, index, out=self.spare[1:-1, 1:-1], mode='clip')
+
+    def step_python(self):
+        board, spare, table, deltas = self.board, self.spare, self.table, self.deltas
+        stride = self.width + 2
+        for r in range(1, self.height + 1):
+            for i in range(r * stride + 1, r * stride + 1 + self.width):
+                n = 0
+                for delta in deltas:
+                    n += board[i + delta]
+                spare[i] = table[9 * board[i] + n]
+
+    @property
+    def population(self):
+        """The number of live cells."""
+        if self.np is not None:
+            return int(self.board.sum())
+        return self.board.count(1)
+
+    def cells(self):
+        """The current board as a list of 0/1 rows."""
+        if self.np is not None:
+            return self.board[1:-1, 1:-1].tolist()
+        stride = self.width + 2
+        return [list(self.board[r * stride + 1:r * stride + 1 + self.width])
+                for r in range(1, self.height + 1)]
+
+    def __str__(self):
+        return '\n'.join(''.join(self.alive if x else '.' for x in row) for row in self.cells())
@@ -0,0 +1,254 @@
+from collections import deque
+from heapq import heappop, heappush
+from statistics import median
+import atexit
+import json
+import math
+import os
+import random
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import traceback
+
+
+class Sample:
+    """Measurements of a single run of a solution."""
+
+    def __init__(self, wall, cpu, rss, exitcode, answer):
+        self.wall = wall
+        self.cpu = cpu
+        self.rss = rss
+        self.exitcode = exitcode
+        self.answer = answer
+
+
+def exec_script(script, argv):
+    """Run a script as __main__ in this (forked) process, then exit with its exit code."""
+    sys.argv = argv
+    code = 0
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 0
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    # os._exit() skips atexit, which reports @memo stats, saves persisted caches and profiles
+    atexit._run_exitfuncs()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
+
+
+def run_once(script, arg, warm):
+    """Run the script once on the given input (0 = real, i = i'th sample) and measure it.
+
+    With warm=True the run is forked from this (already warmed up) interpreter, otherwise a
+    fresh interpreter is spawned. Either way the answer is captured instead of submitted.
+    """
+    fd, capture_path = tempfile.mkstemp(prefix='aoc-bench-')
+    os.close(fd)
+    env = dict(os.environ, AOC_CAPTURE=capture_path)
+    argv = [script] + ([str(arg)] if arg else [])
+    try:
+        start = time.perf_counter()
+        if warm:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                devnull = os.open(os.devnull, os.O_WRONLY)
+                os.dup2(devnull, 1)
+                os.environ['AOC_CAPTURE'] = capture_path
+                exec_script(script, argv)
+        else:
+            proc = subprocess.Popen([sys.executable] + argv, env=env, stdout=subprocess.DEVNULL)
+            pid = proc.pid
+        _, status, rusage = os.wait4(pid, 0)
+        wall = time.perf_counter() - start
+        if not warm:
+            # Tell Popen the child is reaped, or it warns and polls the stale pid later on
+            proc.returncode = os.waitstatus_to_exitcode(status)
+
+        with open(capture_path) as f:
+            answer = f.read()
+    finally:
+        os.unlink(capture_path)
+
+    cpu = rusage.ru_utime + rusage.ru_stime
+    # ru_maxrss is in KiB on Linux
+    return Sample(wall, cpu, rusage.ru_maxrss * 1024, os.waitstatus_to_exitcode(status), answer)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, math.ceil(p * len(values)) - 1)]
+
+
+def summarize(samples):
+    walls = [s.wall for s in samples]
+    return {
+        'runs': len(samples),
+        'wall_min': min(walls),
+        'wall_median': median(walls),
+        'wall_p95': percentile(walls, 0.95),
+        'cpu_median': median(s.cpu for s in samples),
+        'rss_max': max(s.rss for s in samples),
+        'answer': samples[-1].answer,
+        'failures': sum(s.exitcode != 0 for s in samples),
+    }
+
+
+def baseline_path(script, warm):
+    # Warm and fresh runs aren't comparable, so they get separate baselines
+    return os.path.splitext(script)[0] + ('.bench-warm.json' if warm else '.bench.json')
+
+
+def load_baseline(script, warm):
+    try:
+        with open(baseline_path(script, warm)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(script, warm, results):
+    with open(baseline_path(script, warm), 'w') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+
+
+def micro_cases():
+    """(name, xstr/xlist operation, builtin counterpart) triples for the micro-benchmarks."""
+    from aoc.types import UINT_PATTERN, xlist, xstr
+    s = 'lorem ipsum dolor sit amet, 12 34 -56 ' * 4
+    xs = xstr(s)
+    words, xwords = s.split(), xs.split()
+    return [
+        ('str[i]', lambda: xs[5], lambda: s[5]),
+        ('str[a:b]', lambda: xs[3:20], lambda: s[3:20]),
+        ('iter(str)', lambda: list(xs), lambda: list(s)),
+        ('for c in str: c == x', lambda: [c == 'x' for c in xs], lambda: [c == 'x' for c in s]),
+        ('str.strip()', lambda: xs.strip(), lambda: s.strip()),
+        ('str.replace()', lambda: xs.replace('o', '0'), lambda: s.replace('o', '0')),
+        ('str.split()', lambda: xs.split(), lambda: s.split()),
+        ('str.split(sep)', lambda: xs.split(','), lambda: s.split(',')),
+        ('str + str', lambda: xs + 'abc', lambda: s + 'abc'),
+        ('str.ints', lambda: xs.ints, lambda: list(map(int, UINT_PATTERN.findall(s)))),
+        ('list(strs)', lambda: xlist(words), lambda: list(words)),
+        ('list.strip()', lambda: xwords.strip(','), lambda: [w.strip(',') for w in words]),
+        ('list.upper()', lambda: xwords.upper(), lambda: [w.upper() for w in words]),
+        ('list.lc', lambda: xwords.lc, lambda: [w.lower() for w in words]),
+        ('list[i]', lambda: xwords[3], lambda: words[3]),
+        ('list + list', lambda: xwords + xwords, lambda: words + words),
+    ]
+
+
+def run_micro(number=None, repeat=3):
+    """Time every micro-benchmark case, yielding (name, xtime, builtin time) per call."""
+    for name, xfunc, func in micro_cases():
+        timer, xtimer = timeit.Timer(func), timeit.Timer(xfunc)
+        n = number or xtimer.autorange()[0]
+        base = min(timer.repeat(repeat, n)) / n
+        yield name, min(xtimer.repeat(repeat, n)) / n, base
+
+
+def import_times(statement='from aoc import *', package='aoc'):
+    """Run statement in a fresh interpreter under -X importtime, returning the cumulative
+    import time of package, and (self time, module) pairs for everything it imported, in us."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        # Nesting is shown by indentation, and modules are listed once they finish importing
+        depth = len(name) - len(name.lstrip())
+        rows.append((int(self_us), int(cumulative), depth, name.strip()))
+    for i, (_, cumulative, depth, name) in enumerate(rows):
+        if name == package:
+            j = i
+            while j and rows[j - 1][2] > depth:
+                j -= 1
+            return cumulative, [(row[0], row[3]) for row in rows[j:i + 1]]
+    raise ValueError(f'{package!r} was not imported by {statement!r}')
+
+
+def maze(size, weighted=False, walls=0.3, seed=0):
+    """A random size x size maze of rows (digit costs 1-9 if weighted), with open 2x2 corners."""
+    rng = random.Random(seed)
+    cells = '123456789' if weighted else '.'
+    rows = [''.join('#' if rng.random() < walls else rng.choice(cells) for _ in range(size))
+            for _ in range(size)]
+    for r in (0, 1):
+        rows[r] = cells[0] * 2 + rows[r][2:]
+        rows[-1 - r] = rows[-1 - r][:-2] + cells[0] * 2
+    return rows
+
+
+def naive_bfs(rows, start):
+    """The dict-of-tuples BFS that the packed one in aoc.graph replaces."""
+    height, width = len(rows), len(rows[0])
+    dist = {start: 0}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        r, c = node
+        d = dist[node] + 1
+        for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+            nbr = r + dr, c + dc
+            if (0 <= nbr[0] < height and 0 <= nbr[1] < width and rows[nbr[0]][nbr[1]] != '#'
+                    and nbr not in dist):
+                dist[nbr] = d
+                queue.append(nbr)
+    return dist
+
+
+def naive_dijkstra(rows, start):
+    """The dict-of-tuples Dijkstra, with (distance, node) tuples on the heap."""
+    height, width = len(rows), len(rows[0])
+    dist = {start: 0}
+    queue = [(0, start)]
+    while queue:
+        d, node = heappop(queue)
+        if d > dist[node]:
+            continue
+        r, c = node
+        for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+            nbr = r + dr, c + dc
+            if 0 <= nbr[0] < height and 0 <= nbr[1] < width and rows[nbr[0]][nbr[1]] != '#':
+                nd = d + int(rows[nbr[0]][nbr[1]])
+                if nd < dist.get(nbr, nd + 1):
+                    dist[nbr] = nd
+                    heappush(queue, (nd, nbr))
+    return dist
+
+
+def run_search(size, naive=True):
+    """Time full searches from a corner of a random maze with aoc.graph, and (unless naive is
+    False) with the naive versions, yielding (name, packed time, naive time or None) per search.
+    Both must find the same distance to the opposite corner."""
+    from aoc.graph import bfs, dijkstra
+    goal = (size - 1, size - 1)
+    searches = [
+        ('bfs', maze(size), lambda rows: bfs((0, 0), rows), naive_bfs),
+        ('dijkstra', maze(size, weighted=True),
+         lambda rows: dijkstra((0, 0), rows, cost=int), naive_dijkstra),
+    ]
+    for name, rows, packed_search, naive_search in searches:
+        start = time.perf_counter()
+        packed_dist = packed_search(rows).get(goal)
+        packed = time.perf_counter() - start
+        naive_time = None
+        if naive:
+            start = time.perf_counter()
+            naive_dist = naive_search(rows, (0, 0)).get(goal)
+            naive_time = time.perf_counter() - start
+            if naive_dist != packed_dist:
+                raise AssertionError(f'{name}: {naive_dist} (naive) != {packed_dist} (packed)')
+        yield name, packed, naive_time
@@ -0,0 +1,170 @@
+__all__ = [
+    'BitFields',
+    'Labels',
+    'bits',
+    'popcount',
+    'sos_subsets',
+    'sos_supersets',
+    'subsets',
+    'supersets',
+]
+
+
+from operator import add
+
+
+def popcount(x):
+    """The number of set bits of x."""
+    return x.bit_count()
+
+def bits(x):
+    """Yields the indices of the set bits of x, from the lowest."""
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+def subsets(mask):
+    """Yields every subset of mask (including mask itself and 0), from the largest."""
+    sub = mask
+    while True:
+        yield sub
+        if not sub:
+            return
+        sub = (sub - 1) & mask
+
+def supersets(mask, n):
+    """Yields every superset of mask among the n-bit ints (including mask itself), from mask."""
+    full = (1 << n) - 1
+    sup = mask
+    while sup <= full:
+        yield sup
+        sup = (sup + 1) | mask
+
+def sos_subsets(values, n, op=add):
+    """Sum over subsets DP: afterwards values[mask] combines (with op) the original values of
+    every subset of mask. values is a list of length 2**n, updated in place in O(n * 2**n)."""
+    for i in range(n):
+        bit = 1 << i
+        # Only visit the masks with this bit set, in runs of length bit
+        for base in range(bit, 1 << n, bit << 1):
+            for mask in range(base, base + bit):
+                values[mask] = op(values[mask], values[mask ^ bit])
+    return values
+
+def sos_supersets(values, n, op=add):
+    """Like sos_subsets(), but combining the values of every superset of each mask."""
+    for i in range(n):
+        bit = 1 << i
+        for base in range(0, 1 << n, bit << 1):
+            for mask in range(base, base + bit):
+                values[mask] = op(values[mask], values[mask | bit])
+    return values
+
+
+class Labels:
+    """Interns hashable labels (e.g. key or valve names) as bit indices, assigned in order of
+    first appearance, so that sets of them become int masks."""
+
+    def __init__(self, labels=()):
+        self.indices = {}
+        self.labels = []
+        for label in labels:
+            self.index(label)
+
+    def index(self, label):
+        """The bit index of a label, interning it if it is new."""
+        i = self.indices.get(label)
+        if i is None:
+            i = self.indices[label] = len(self.labels)
+            self.labels.append(label)
+        return i
+
+    def bit(self, label):
+        return 1 << self.index(label)
+
+    def mask(self, labels):
+        """The mask of a collection of labels."""
+        mask = 0
+        for label in labels:
+            mask |= 1 << self.index(label)
+        return mask
+
+    def decode(self, mask):
+        """The labels of a mask, in order of their bits."""
+        return [self.labels[i] for i in bits(mask)]
+
+    @property
+    def full(self):
+        """The mask of every label interned so far."""
+        return (1 << len(self.labels)) - 1
+
+    def __getitem__(self, label):
+        return self.indices[label]
+
+    def __contains__(self, label):
+        return label in self.indices
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __repr__(self):
+        return f'Labels({self.labels!r})'
+
+
+class BitFields:
+    """A layout for packing multi-field states into single ints, e.g. for DP or Dijkstra keys.
+
+    Fields are declared with their widths in bits, first field in the lowest bits:
+    BitFields(pos=6, keys=26, time=5).pack(pos, keys, time) == pos | keys << 6 | time << 32.
+    """
+
+    def __init__(self, **widths):
+        self.names = list(widths)
+        self.widths = [widths[name] for name in self.names]
+        self.shifts = []
+        shift = 0
+        for width in self.widths:
+            if width <= 0:
+                raise ValueError('field widths must be positive')
+            self.shifts.append(shift)
+            shift += width
+        self.bits = shift
+        self.masks = [(1 << width) - 1 for width in self.widths]
+        self.fields = {name: (shift, mask) for name, shift, mask in
+                       zip(self.names, self.shifts, self.masks)}
+
+    def pack(self, *values, **named):
+        """Pack field values (positionally in declaration order, or by name) into an int."""
+        if named:
+            values = values + tuple(named[name] for name in self.names[len(values):])
+        if len(values) != len(self.names):
+            raise TypeError(f'expected {len(self.names)} field values, got {len(values)}')
+        state = 0
+        for name, value, shift, mask in zip(self.names, values, self.shifts, self.masks):
+            if not 0 <= value <= mask:
+                raise ValueError(f'{value} does not fit in field {name!r} of {mask.bit_length()} bits')
+            state |= value << shift
+        return state
+
+    def unpack(self, state):
+        """The tuple of field values of a packed state."""
+        return tuple((state >> shift) & mask for shift, mask in zip(self.shifts, self.masks))
+
+    def get(self, state, name):
+        shift, mask = self.fields[name]
+        return (state >> shift) & mask
+
+    def set(self, state, name, value):
+        """A copy of the packed state with one field replaced."""
+        shift, mask = self.fields[name]
+        if not 0 <= value <= mask:
+            raise ValueError(f'{value} does not fit in field {name!r} of {mask.bit_length()} bits')
+        return state & ~(mask << shift) | value << shift
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={width}' for name, width in zip(self.names, self.widths))
+        return f'BitFields({fields})'
@@ -1,9 +1,15 @@
-from aoc.api import AOCError, Puzzle, aoc_session_path, register_aoc_session
+from aoc.api import (AOCError, aoc_session_path, aoc_url, default_store, fetch_input,
+                     get_aoc_session, get_current_time, make_req_session, register_aoc_session)
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from statistics import median
 from zoneinfo import ZoneInfo
 import colorful as cf
+import math
 import os
+import random
+import threading
 import time
 
 def run_session(args):
@@ -45,7 +51,12 @@ def run_template(args):
     with open(filename, 'w') as f:
         f.write(template.format(year, day))
 
-def run_countdown(_):
+def sleep_until(deadline):
+    """Sleep until time.monotonic() reaches deadline, without busy-waiting."""
+    while (remaining := deadline - time.monotonic()) > 0:
+        time.sleep(remaining)
+
+def run_countdown(args):
     zone = ZoneInfo('US/Eastern')
     current_time = datetime.now(zone)
     start_time = current_time + timedelta(1)
@@ -55,32 +66,231 @@ def run_countdown(_):
     year, day = start_time.year, start_time.day
     print(cf.white(f'Counting down from Advent of Code {year}, Day {day}...'))
 
-    record_interval = timedelta(seconds=1)
-    last_recorded_time = current_time
-
-    while True:
-        if current_time - last_recorded_time >= record_interval:
-            last_recorded_time = current_time
-            time_left = start_time - current_time
-            seconds = time_left.seconds
-            hours, rem = divmod(seconds, 3600)
-            minutes, seconds = divmod(rem, 60)
-            print(cf.white('%02d:%02d:%02d' % (hours, minutes, seconds)))
-
-        if current_time > start_time:
-            # try grabbing input 3 times before giving up
-            for _ in range(3):
-                puzzle = Puzzle(year, day)
-                try:
-                    print(puzzle.data.rstrip('\n'))
-                    break
-                except AOCError as e:
-                    print(cf.red(str(e)))
-                    print(cf.red(f'Failed to fetch input, trying again...'))
-                time.sleep(0.2)
+    # Work on the monotonic clock from here on, so that wall clock adjustments can't bite us
+    unlock = time.monotonic() + (start_time - current_time).total_seconds()
+    req_session = make_req_session(get_aoc_session())
+    warmed_up = False
+
+    while (time_left := unlock - time.monotonic()) > 0:
+        # Open (and later reuse) a keep-alive connection shortly before the unlock, so that the
+        # real request doesn't pay for the TCP/TLS handshake
+        if not warmed_up and time_left <= args.warmup:
+            warmed_up = True
+            try:
+                req_session.head(aoc_url, timeout=5)
+            except OSError as e:
+                print(cf.yellow(f'Failed to warm up the connection: {e}'))
+            continue
+
+        seconds = math.ceil(time_left)
+        hours, rem = divmod(seconds, 3600)
+        minutes, seconds = divmod(rem, 60)
+        print(cf.white('%02d:%02d:%02d' % (hours, minutes, seconds)))
+        # Wake up on the next whole second, or at the warmup point if that comes first
+        next_tick = time_left - (math.ceil(time_left) - 1)
+        if not warmed_up and time_left > args.warmup:
+            next_tick = min(next_tick, time_left - args.warmup)
+        sleep_until(time.monotonic() + next_tick)
+
+    # Retry with jittered exponential backoff, to avoid hammering the server in lockstep
+    delay = 0.1
+    for attempt in range(args.retries):
+        try:
+            data = fetch_input(req_session, year, day)
             break
+        except (AOCError, OSError) as e:
+            print(cf.red(f'Failed to fetch input ({e}), trying again...'))
+        time.sleep(delay * random.uniform(0.5, 1.5))
+        delay = min(delay * 2, 5)
+    else:
+        print(cf.red(f'Giving up after {args.retries} attempts.'))
+        return
+
+    fetched = time.monotonic()
+    print(data.rstrip('\n'))
+    shown = time.monotonic()
+    default_store.put(year, day, data)
+    print(cf.white(f'Input fetched {(fetched - unlock) * 1000:.0f} ms after unlock '
+                   f'(attempt {attempt + 1}), on screen after {(shown - unlock) * 1000:.0f} ms'))
+
+def parse_range(s):
+    """Parse a range spec such as '2015-2024', '1,3,5-7' or '2023' into a sorted list of ints."""
+    result = set()
+    for part in s.split(','):
+        lo, _, hi = part.partition('-')
+        result.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(result)
+
+
+class RateLimiter:
+    """Enforce a global minimum interval between requests across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+def run_fetch(args):
+    current_time = get_current_time()
+    todo = []
+    skipped = 0
+    for year in parse_range(args.year):
+        for day in parse_range(args.days):
+            # Skip puzzles that have not been unlocked yet
+            if not 2015 <= year <= current_time.year or not 1 <= day <= 25:
+                continue
+            if year == current_time.year and (current_time.month < 12 or day > current_time.day):
+                continue
+            if (year, day) in default_store:
+                skipped += 1
+            else:
+                todo.append((year, day))
+
+    print(cf.white(f'Fetching {len(todo)} inputs ({skipped} already cached)...'))
+    if not todo:
+        return
+
+    req_session = make_req_session(get_aoc_session(), pool_size=args.workers)
+    limiter = RateLimiter(args.rate)
+
+    def fetch_one(year, day):
+        limiter.wait()
+        start = time.perf_counter()
+        data = fetch_input(req_session, year, day)
+        latency = time.perf_counter() - start
+        # Every input is written as soon as it arrives, so an interrupted run resumes from here
+        default_store.put(year, day, data)
+        return latency, len(data)
+
+    latencies = []
+    total_bytes = 0
+    failed = 0
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(fetch_one, year, day): (year, day) for year, day in todo}
+        for future in as_completed(futures):
+            year, day = futures[future]
+            try:
+                latency, size = future.result()
+            except (AOCError, OSError) as e:
+                failed += 1
+                print(cf.red(f'{year} day {day:2}: {e}'))
+                continue
+            latencies.append(latency)
+            total_bytes += size
+            print(f'{year} day {day:2}: {size} bytes in {latency * 1000:.0f} ms')
+    elapsed = time.perf_counter() - start_time
 
-        current_time = datetime.now(zone)
+    print(cf.white(f'Fetched {len(latencies)} inputs ({failed} failed) in {elapsed:.2f}s: '
+                   f'{len(latencies) / elapsed:.2f} inputs/s, {total_bytes / 1024 / elapsed:.1f} KiB/s'))
+    if latencies:
+        print(cf.white(f'Latency: min {min(latencies) * 1000:.0f} ms, '
+                       f'median {median(latencies) * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms'))
+
+def format_ms(seconds):
+    return f'{seconds * 1000:.1f} ms'
+
+def run_bench(args):
+    from aoc import bench
+    if args.warm:
+        # Pay for the imports once, so that every forked run starts warm
+        import aoc
+
+    inputs = [('real input', 0)] + [(f'sample #{k}', k) for k in args.sample or ()]
+    baseline = bench.load_baseline(args.script, args.warm)
+    results = {}
+    regressed = False
+
+    for label, arg in inputs:
+        samples = [bench.run_once(args.script, arg, args.warm) for _ in range(args.n)]
+        result = results[label] = bench.summarize(samples)
+        print(cf.white(f'{label}: min {format_ms(result["wall_min"])} | '
+                       f'median {format_ms(result["wall_median"])} | '
+                       f'p95 {format_ms(result["wall_p95"])} | '
+                       f'cpu {format_ms(result["cpu_median"])} | '
+                       f'rss {result["rss_max"] / 2**20:.1f} MiB | '
+                       f'answer {result["answer"]!r}'))
+        if result['failures']:
+            print(cf.red(f'  {result["failures"]} of {result["runs"]} runs exited with an error'))
+
+        old = (baseline or {}).get(label)
+        if args.save or old is None:
+            continue
+        ratio = result['wall_median'] / old['wall_median']
+        if ratio > 1 + args.threshold:
+            regressed = True
+            print(cf.red(f'  regression: median is {ratio:.2f}x the baseline '
+                         f'({format_ms(old["wall_median"])})'))
+        elif ratio < 1 - args.threshold:
+            print(cf.green(f'  improvement: median is {ratio:.2f}x the baseline '
+                           f'({format_ms(old["wall_median"])})'))
+        if result['answer'] != old['answer']:
+            regressed = True
+            print(cf.red(f'  answer changed from the baseline ({old["answer"]!r})'))
+
+    if args.save or baseline is None:
+        bench.save_baseline(args.script, args.warm, results)
+        print(cf.white(f'Saved baseline to {bench.baseline_path(args.script, args.warm)!r}'))
+    if regressed:
+        exit(1)
+
+def run_microbench(args):
+    from aoc import bench
+    print(cf.white(f'{"operation":24} {"xstr/xlist":>12} {"builtin":>12} {"overhead":>9}'))
+    for name, xtime, base in bench.run_micro(args.n):
+        ratio = xtime / base
+        color = cf.green if ratio < 1.5 else cf.yellow if ratio < 3 else cf.red
+        print(color(f'{name:24} {xtime * 1e9:10.0f}ns {base * 1e9:10.0f}ns {ratio:8.2f}x'))
+
+def run_searchbench(args):
+    from aoc import bench
+    print(cf.white(f'{"search":20} {"aoc.graph":>10} {"naive":>10} {"speedup":>8}'))
+    for size in args.size:
+        for name, packed, naive in bench.run_search(size, naive=not args.no_naive):
+            label = f'{name} {size}x{size}'
+            if naive is None:
+                print(f'{label:20} {packed:9.2f}s {"-":>10}')
+            else:
+                print(f'{label:20} {packed:9.2f}s {naive:9.2f}s {naive / packed:7.2f}x')
+
+def run_importtime(args):
+    from aoc import bench
+    runs = [bench.import_times() for _ in range(args.n)]
+    total = median(cumulative for cumulative, _ in runs) / 1000
+    _, modules = min(runs)
+    print(cf.white(f'{"module":32} {"self":>10}'))
+    for self_us, name in sorted(modules, reverse=True)[:args.top]:
+        print(f'{name:32} {self_us / 1000:8.1f} ms')
+    color = cf.green if total <= args.budget else cf.red
+    print(color(f'from aoc import *: median {total:.1f} ms over {args.n} runs '
+                f'(budget {args.budget:g} ms)'))
+    if total > args.budget:
+        exit(1)
+
+def run_watch(args):
+    from aoc import watch
+    watch.preload(args.script)
+    watcher = watch.Watcher(args.script, args.interval, args.poll)
+    argv = [args.script] + args.args
+    print(cf.white(f'Watching {args.script!r} for changes ({watcher.method}), Ctrl-C to stop'))
+    try:
+        while True:
+            code, elapsed = watch.run_forked(args.script, argv)
+            color = cf.green if code == 0 else cf.red
+            print(color(f'--- finished in {format_ms(elapsed)} (exit code {code}) ---'))
+            watcher.wait()
+            print(cf.white(f'--- {args.script} changed at {datetime.now():%H:%M:%S}, rerunning ---'))
+    except KeyboardInterrupt:
+        pass
 
 def main():
     description = 'A command-line toolchain for competing in Advent of Code.'
@@ -102,8 +312,74 @@ def main():
 
     countdown_parser = subparsers.add_parser('countdown',
         help='countdown until day starts and dump the input')
+    countdown_parser.add_argument('--warmup', type=float, default=10,
+        help='seconds before the unlock to open a keep-alive connection (default: 10)')
+    countdown_parser.add_argument('--retries', type=int, default=10,
+        help='number of attempts at fetching the input (default: 10)')
     countdown_parser.set_defaults(func=run_countdown)
 
+    fetch_parser = subparsers.add_parser('fetch',
+        help='prefetch inputs for whole seasons into the cache')
+    fetch_parser.add_argument('--year', default=str(get_current_time().year),
+        help="years to fetch, e.g. '2015-2024' or '2019,2021'")
+    fetch_parser.add_argument('--days', default='1-25',
+        help="days to fetch, e.g. '1-25' (default) or '1,5-7'")
+    fetch_parser.add_argument('--workers', type=int, default=4,
+        help='number of concurrent requests (default: 4)')
+    fetch_parser.add_argument('--rate', type=float, default=2.0,
+        help='maximum requests per second across all workers (default: 2)')
+    fetch_parser.set_defaults(func=run_fetch)
+
+    bench_parser = subparsers.add_parser('bench',
+        help='benchmark a solution and compare it against a saved baseline')
+    bench_parser.add_argument('script', nargs='?', default='solve.py')
+    bench_parser.add_argument('-n', type=int, default=10,
+        help='number of runs per input (default: 10)')
+    bench_parser.add_argument('--sample', type=int, action='append',
+        help='also benchmark the given sample number (can be repeated)')
+    bench_parser.add_argument('--warm', action='store_true',
+        help='fork each run from a warm interpreter instead of starting a fresh one')
+    bench_parser.add_argument('--save', action='store_true',
+        help='overwrite the saved baseline with this run')
+    bench_parser.add_argument('--threshold', type=float, default=0.1,
+        help='relative slowdown of the median that counts as a regression (default: 0.1)')
+    bench_parser.set_defaults(func=run_bench)
+
+    microbench_parser = subparsers.add_parser('microbench',
+        help='compare the speed of xstr/xlist operations against plain str/list')
+    microbench_parser.add_argument('-n', type=int, default=None,
+        help='calls per timing (default: chosen automatically)')
+    microbench_parser.set_defaults(func=run_microbench)
+
+    searchbench_parser = subparsers.add_parser('searchbench',
+        help='compare the grid searches of aoc.graph against naive dict-of-tuples ones')
+    searchbench_parser.add_argument('--size', type=int, nargs='+', default=[1000, 5000],
+        help='side lengths of the random mazes (default: 1000 5000)')
+    searchbench_parser.add_argument('--no-naive', action='store_true',
+        help='only time aoc.graph (the naive searches need several GiB at 5000x5000)')
+    searchbench_parser.set_defaults(func=run_searchbench)
+
+    importtime_parser = subparsers.add_parser('importtime',
+        help="measure the cold start of 'from aoc import *', failing if it is over budget")
+    importtime_parser.add_argument('--budget', type=float, default=50,
+        help='maximum median import time in ms (default: 50)')
+    importtime_parser.add_argument('-n', type=int, default=5,
+        help='number of fresh interpreters to time (default: 5)')
+    importtime_parser.add_argument('--top', type=int, default=10,
+        help='number of slowest modules to list (default: 10)')
+    importtime_parser.set_defaults(func=run_importtime)
+
+    watch_parser = subparsers.add_parser('watch',
+        help='rerun a solution from a warm interpreter every time it is saved')
+    watch_parser.add_argument('script', nargs='?', default='solve.py')
+    watch_parser.add_argument('args', nargs='*',
+        help='arguments for the script, e.g. a sample number')
+    watch_parser.add_argument('--poll', action='store_true',
+        help='poll the modification time instead of using inotify')
+    watch_parser.add_argument('--interval', type=float, default=0.05,
+        help='seconds between polls (default: 0.05)')
+    watch_parser.set_defaults(func=run_watch)
+
     args = parser.parse_args()
     args.func(args)
 
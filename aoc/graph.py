@@ -0,0 +1,384 @@
+__all__ = [
+    'DistMap',
+    'astar',
+    'bfs',
+    'bfs01',
+    'dijkstra',
+]
+
+
+from aoc.helpers import D4
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+
+INF = float('inf')
+
+
+class GridGraph:
+    """A grid flattened into one bytes object with a border of walls, so that a neighbour of a
+    cell is just an integer offset away and never needs a bounds check."""
+
+    def __init__(self, grid, wall, moves):
+        if hasattr(grid, 'data') and hasattr(grid, 'width'):
+            rows = [bytes(grid.row(r)) for r in range(grid.height)]
+        else:
+            rows = [''.join(row).encode('latin-1') for row in grid]
+        # The flat layout relies on a fixed stride: ragged rows would silently shift cells around
+        if any(len(row) != len(rows[0]) for row in rows):
+            raise ValueError('all rows of a grid must have the same length')
+        self.wall = ord(wall)
+        self.height = len(rows)
+        self.width = len(rows[0]) + 2 if rows else 2
+        border = bytes([self.wall]) * self.width
+        self.data = border + b''.join(
+            bytes([self.wall]) + row + bytes([self.wall]) for row in rows) + border
+        self.deltas = [dr * self.width + dc for dr, dc in moves]
+        self.diagonal = any(dr and dc for dr, dc in moves)
+
+    def id(self, pos):
+        r, c = pos
+        if not (0 <= r < self.height and 0 <= c < self.width - 2):
+            raise IndexError(f'position out of bounds: {pos}')
+        return (r + 1) * self.width + c + 1
+
+    def pos(self, i):
+        r, c = divmod(i, self.width)
+        return r - 1, c - 1
+
+    def weights(self, cost):
+        """A lookup table from cell byte to the cost of stepping onto that cell."""
+        table = [None] * 256
+        for b in set(self.data):
+            if b != self.wall:
+                try:
+                    table[b] = cost(chr(b))
+                except Exception as e:
+                    table[b] = CostError(e)
+        return table
+
+    def heuristic(self, goal_id, scale):
+        gr, gc = divmod(goal_id, self.width)
+        width = self.width
+        if self.diagonal:
+            def h(i):
+                r, c = divmod(i, width)
+                return max(abs(r - gr), abs(c - gc)) * scale
+        else:
+            def h(i):
+                r, c = divmod(i, width)
+                return (abs(r - gr) + abs(c - gc)) * scale
+        return h
+
+
+class CostError:
+    """The cost of a cell that cost() failed on (e.g. int('S') for a start marker), which only
+    raises once a search actually steps onto such a cell."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class DistMap:
+    """Distances from a grid search, stored in a flat list indexed by packed cell ids.
+
+    Unreached cells hold -1 (bfs) or INF (weighted searches).
+    """
+
+    def __init__(self, graph, dist):
+        self.graph = graph
+        self.dist = dist
+
+    def __getitem__(self, pos):
+        d = self.dist[self.graph.id(pos)]
+        if d < 0 or d == INF:
+            raise KeyError(pos)
+        return d
+
+    def get(self, pos, default=None):
+        try:
+            return self[pos]
+        except (KeyError, IndexError):
+            return default
+
+    def __contains__(self, pos):
+        return self.get(pos) is not None
+
+    def items(self):
+        pos = self.graph.pos
+        return ((pos(i), d) for i, d in enumerate(self.dist) if 0 <= d < INF)
+
+    def keys(self):
+        return (pos for pos, _ in self.items())
+
+    __iter__ = keys
+
+    def values(self):
+        return (d for d in self.dist if 0 <= d < INF)
+
+    def __len__(self):
+        return sum(0 <= d < INF for d in self.dist)
+
+    def __repr__(self):
+        return f'DistMap({len(self)} reached)'
+
+
+def is_multi(start):
+    return isinstance(start, (list, set, frozenset))
+
+def to_graph(graph, wall, moves):
+    return None if callable(graph) else GridGraph(graph, wall, moves)
+
+def resolve_goal(graph, goal):
+    """Turn a goal (a node, or a predicate on nodes) into a predicate on packed cell ids."""
+    if goal is None:
+        return None, None
+    if callable(goal):
+        pos = graph.pos
+        return None, lambda i: goal(pos(i))
+    return graph.id(goal), None
+
+def finish(graph, dist, parent, found, goal, path):
+    """Shared return convention of every search below (see bfs())."""
+    if goal is None:
+        if graph is None:
+            return dist
+        return DistMap(graph, dist)
+    if found is None:
+        return (None, None) if path else None
+    d = dist[found]
+    if not path:
+        return d
+    # Sources have no parent: None in a dict, -1 in a flat list
+    root = None if graph is None else -1
+    nodes = []
+    while found != root:
+        nodes.append(found if graph is None else graph.pos(found))
+        found = parent[found]
+    return d, nodes[::-1]
+
+
+def bfs(start, graph, goal=None, path=False, moves=D4, wall='#'):
+    """Breadth-first search from start (or a list of starts, for a multi-source search).
+
+    graph is either a function mapping a node to its neighbours, or a grid (a Grid, or a list of
+    rows) searched directly with the given moves, where cells equal to wall are impassable and
+    nodes are (r, c) tuples. goal is an optional node or predicate to stop early at.
+
+    Returns every distance (a dict, or a DistMap for grids) if there is no goal, otherwise the
+    distance to the goal (None if unreachable), or (distance, nodes) with path=True.
+    """
+    grid = to_graph(graph, wall, moves)
+    starts = list(start) if is_multi(start) else [start]
+    if grid is None:
+        return bfs_generic(starts, graph, goal, path)
+
+    goal_id, is_goal = resolve_goal(grid, goal)
+    data, deltas, wall = grid.data, grid.deltas, grid.wall
+    dist = [-1] * len(data)
+    parent = [-1] * len(data) if path else None
+    frontier = []
+    found = None
+    for s in map(grid.id, starts):
+        dist[s] = 0
+        frontier.append(s)
+        if s == goal_id or (is_goal is not None and is_goal(s)):
+            found = s
+
+    d = 0
+    while frontier and found is None:
+        d += 1
+        next_frontier = []
+        for i in frontier:
+            for delta in deltas:
+                j = i + delta
+                if dist[j] < 0 and data[j] != wall:
+                    dist[j] = d
+                    if path:
+                        parent[j] = i
+                    if j == goal_id or (is_goal is not None and is_goal(j)):
+                        found = j
+                        break
+                    next_frontier.append(j)
+            if found is not None:
+                break
+        frontier = next_frontier
+    return finish(grid, dist, parent, found, goal, path)
+
+def bfs_generic(starts, neighbors, goal, path):
+    is_goal = goal if callable(goal) else None
+    dist = {}
+    parent = {} if path else None
+    queue = deque()
+    found = None
+    for s in starts:
+        dist[s] = 0
+        if path:
+            parent[s] = None
+        queue.append(s)
+        if s == goal or (is_goal is not None and is_goal(s)):
+            found = s
+
+    while queue and found is None:
+        node = queue.popleft()
+        d = dist[node] + 1
+        for nbr in neighbors(node):
+            if nbr not in dist:
+                dist[nbr] = d
+                if path:
+                    parent[nbr] = node
+                if nbr == goal or (is_goal is not None and is_goal(nbr)):
+                    found = nbr
+                    break
+                queue.append(nbr)
+    return finish(None, dist, parent, found, goal, path)
+
+
+def bfs01(start, graph, goal=None, path=False, moves=D4, wall='#', cost=None):
+    """0-1 BFS: a shortest path search where every edge costs either 0 or 1.
+
+    For a neighbour function, it should yield (node, cost) pairs. For grids, cost maps the
+    character of the cell being stepped onto to its cost. Otherwise the same as bfs().
+    """
+    return weighted_search(start, graph, goal, path, moves, wall, cost, None, zero_one=True)
+
+def dijkstra(start, graph, goal=None, path=False, moves=D4, wall='#', cost=None):
+    """Dijkstra's algorithm, for shortest paths with nonnegative edge costs.
+
+    For a neighbour function, it should yield (node, cost) pairs. For grids, cost maps the
+    character of the cell being stepped onto to its cost (e.g. cost=int for a grid of digits),
+    and defaults to 1 per step. Cells it raises on, such as 'S'/'E' markers with cost=int, are
+    only an error if the search steps onto one. Otherwise the same as bfs().
+    """
+    return weighted_search(start, graph, goal, path, moves, wall, cost, None)
+
+def astar(start, graph, goal, path=False, moves=D4, wall='#', cost=None, heuristic=None):
+    """A* search towards a goal, otherwise the same as dijkstra().
+
+    heuristic(node) must never overestimate the remaining cost. On grids it defaults to the
+    Manhattan (or Chebyshev, with diagonal moves) distance to the goal times the cheapest cost.
+    """
+    if goal is None:
+        raise ValueError('astar() requires a goal')
+    return weighted_search(start, graph, goal, path, moves, wall, cost, heuristic)
+
+def weighted_search(start, graph, goal, path, moves, wall, cost, heuristic, zero_one=False):
+    grid = to_graph(graph, wall, moves)
+    starts = list(start) if is_multi(start) else [start]
+    if grid is None:
+        return weighted_generic(starts, graph, goal, path, heuristic, zero_one)
+
+    goal_id, is_goal = resolve_goal(grid, goal)
+    data, deltas = grid.data, grid.deltas
+    table = grid.weights(cost if cost is not None else lambda _: 1)
+    weights = [w for w in table if w is not None and not isinstance(w, CostError)]
+    size = len(data)
+    dist = [INF] * size
+    parent = [-1] * size if path else None
+    h = None
+    if heuristic is not None:
+        h = lambda i: heuristic(grid.pos(i))
+    elif goal_id is not None and not zero_one:
+        h = grid.heuristic(goal_id, min(weights, default=0))
+
+    # Queue entries are single ints packing (priority, id), which are much cheaper than tuples,
+    # as long as priorities are ints: with float costs or a custom heuristic, they are
+    # (priority, distance, id) tuples
+    packed = heuristic is None and all(isinstance(w, int) for w in weights)
+    queue = []
+    for s in map(grid.id, starts):
+        dist[s] = 0
+        priority = h(s) if h is not None else 0
+        queue.append(priority * size + s if packed else (priority, 0, s))
+    found = None
+
+    if zero_one:
+        queue = deque(queue)
+        pop, push, pushleft = queue.popleft, queue.append, queue.appendleft
+    else:
+        queue.sort()
+        pop = lambda: heappop(queue)
+        push = pushleft = lambda key: heappush(queue, key)
+
+    while queue:
+        if packed:
+            d, i = divmod(pop(), size)
+            if h is not None:
+                d -= h(i)
+        else:
+            _, d, i = pop()
+        if d > dist[i]:
+            continue
+        if i == goal_id or (is_goal is not None and is_goal(i)):
+            found = i
+            break
+        for delta in deltas:
+            j = i + delta
+            w = table[data[j]]
+            if w is None:
+                continue
+            try:
+                nd = d + w
+            except TypeError:
+                # A cell cost() failed on is only an error if this would actually reach it (so
+                # not when stepping back onto a start marker)
+                if not isinstance(w, CostError):
+                    raise
+                if dist[j] <= d:
+                    continue
+                raise w.error from None
+            if nd < dist[j]:
+                dist[j] = nd
+                if path:
+                    parent[j] = i
+                if not packed:
+                    key = (nd + h(j) if h is not None else nd, nd, j)
+                    if h is None and w == 0:
+                        pushleft(key)
+                    else:
+                        push(key)
+                elif h is not None:
+                    push((nd + h(j)) * size + j)
+                elif w == 0:
+                    pushleft(nd * size + j)
+                else:
+                    push(nd * size + j)
+    return finish(grid, dist, parent, found, goal, path)
+
+def weighted_generic(starts, neighbors, goal, path, heuristic, zero_one):
+    is_goal = goal if callable(goal) else None
+    dist = {}
+    parent = {} if path else None
+    h = heuristic
+    # The counter breaks ties, so that nodes themselves never need to be comparable
+    tiebreak = count()
+    queue = deque() if zero_one else []
+    for s in starts:
+        dist[s] = 0
+        if path:
+            parent[s] = None
+        queue.append((h(s) if h is not None else 0, next(tiebreak), 0, s))
+    found = None
+
+    while queue:
+        _, _, d, node = queue.popleft() if zero_one else heappop(queue)
+        if d > dist[node]:
+            continue
+        if node == goal or (is_goal is not None and is_goal(node)):
+            found = node
+            break
+        for nbr, w in neighbors(node):
+            nd = d + w
+            old = dist.get(nbr)
+            if old is None or nd < old:
+                dist[nbr] = nd
+                if path:
+                    parent[nbr] = node
+                entry = (nd + h(nbr) if h is not None else nd, next(tiebreak), nd, nbr)
+                if not zero_one:
+                    heappush(queue, entry)
+                elif w == 0:
+                    queue.appendleft(entry)
+                else:
+                    queue.append(entry)
+    return finish(None, dist, parent, found, goal, path)
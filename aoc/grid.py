@@ -0,0 +1,331 @@
+__all__ = [
+    'Grid',
+    'SparseGrid',
+]
+
+
+from aoc.helpers import D4, D8, directions
+from collections import Counter
+
+
+class Grid:
+    """A compact 2D grid of single-byte cells, stored row-major in one flat bytearray.
+
+    Cells are addressed as grid[r, c] (row first, like the nested lists from xstr.grid).
+    A grid can be frozen into a hashable snapshot, so that grid states may be put into sets.
+    """
+
+    __slots__ = ('data', 'width', 'height')
+
+    def __init__(self, data, width, height):
+        if len(data) != width * height:
+            raise ValueError(f'expected {width * height} cells, got {len(data)}')
+        self.data = data
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_str(cls, s):
+        """Parse a rectangular block of text (one row per line) into a Grid."""
+        rows = s.rstrip('\n').split('\n')
+        width = len(rows[0])
+        if any(len(row) != width for row in rows):
+            raise ValueError('all rows of a grid must have the same length')
+        return cls(bytearray(''.join(rows), 'latin-1'), width, len(rows))
+
+    @classmethod
+    def filled(cls, height, width, k='.'):
+        """Returns a height x width grid filled with k."""
+        return cls(bytearray([cls._byte(k)]) * (width * height), width, height)
+
+    @staticmethod
+    def _byte(k):
+        return ord(k) if isinstance(k, str) else k
+
+    @property
+    def frozen(self):
+        return isinstance(self.data, bytes)
+
+    def freeze(self):
+        """Return a hashable, read-only snapshot of the grid."""
+        if self.frozen:
+            return self
+        return Grid(bytes(self.data), self.width, self.height)
+
+    def copy(self):
+        """Return a mutable copy of the grid."""
+        return Grid(bytearray(self.data), self.width, self.height)
+
+    def __eq__(self, other):
+        if not isinstance(other, Grid):
+            return NotImplemented
+        return (self.width == other.width and self.height == other.height
+                and self.data == other.data)
+
+    def __hash__(self):
+        if not self.frozen:
+            raise TypeError("unhashable type: 'Grid' (use Grid.freeze() first)")
+        return hash((self.width, self.data))
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, pos):
+        r, c = pos
+        if not (0 <= r < self.height and 0 <= c < self.width):
+            raise IndexError(f'grid index out of range: {pos}')
+        return chr(self.data[r * self.width + c])
+
+    def __setitem__(self, pos, k):
+        r, c = pos
+        if not (0 <= r < self.height and 0 <= c < self.width):
+            raise IndexError(f'grid index out of range: {pos}')
+        self.data[r * self.width + c] = self._byte(k)
+
+    def get(self, pos, default=None):
+        """Like grid[r, c], but returns a default value when out of bounds."""
+        r, c = pos
+        if 0 <= r < self.height and 0 <= c < self.width:
+            return chr(self.data[r * self.width + c])
+        return default
+
+    def __contains__(self, pos):
+        r, c = pos
+        return 0 <= r < self.height and 0 <= c < self.width
+
+    def __str__(self):
+        return '\n'.join(self.row(r).tobytes().decode('latin-1') for r in range(self.height))
+
+    def __repr__(self):
+        return f'Grid({self.height}x{self.width}{", frozen" if self.frozen else ""})'
+
+    """Searching"""
+
+    def find(self, k):
+        """Returns the (r, c) position of the first cell equal to k, or None."""
+        i = self.data.find(self._byte(k))
+        return divmod(i, self.width) if i >= 0 else None
+
+    def find_all(self, k):
+        """Yields the (r, c) positions of every cell equal to k, in row-major order."""
+        data, b, width = self.data, self._byte(k), self.width
+        i = data.find(b)
+        while i >= 0:
+            yield divmod(i, width)
+            i = data.find(b, i + 1)
+
+    def count(self, k):
+        return self.data.count(self._byte(k))
+
+    def neighbors4(self, r, c):
+        """Yields the in-bounds orthogonal neighbours of (r, c)."""
+        height, width = self.height, self.width
+        for dr, dc in D4:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < height and 0 <= nc < width:
+                yield nr, nc
+
+    def neighbors8(self, r, c):
+        """Yields the in-bounds orthogonal and diagonal neighbours of (r, c)."""
+        height, width = self.height, self.width
+        for dr, dc in D8:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < height and 0 <= nc < width:
+                yield nr, nc
+
+    """Views and transformations"""
+
+    def row(self, r):
+        """A zero-copy memoryview of the r'th row."""
+        return memoryview(self.data)[r * self.width:(r + 1) * self.width]
+
+    def col(self, c):
+        """A zero-copy (strided) memoryview of the c'th column."""
+        return memoryview(self.data)[c::self.width]
+
+    def rows(self):
+        return (self.row(r) for r in range(self.height))
+
+    def cols(self):
+        return (self.col(c) for c in range(self.width))
+
+    def _new(self, data, width, height):
+        return Grid(bytes(data) if self.frozen else data, width, height)
+
+    def transpose(self):
+        data, width, height = self.data, self.width, self.height
+        result = bytearray(len(data))
+        for c in range(width):
+            result[c * height:(c + 1) * height] = data[c::width]
+        return self._new(result, height, width)
+
+    def flip(self):
+        """Reverse the order of the rows (a vertical flip)."""
+        width = self.width
+        result = bytearray().join(
+            self.data[i:i + width] for i in range(len(self.data) - width, -1, -width))
+        return self._new(result, width, self.height)
+
+    def mirror(self):
+        """Reverse every row (a horizontal flip)."""
+        return self._new(bytearray(self.data[::-1]), self.width, self.height).flip()
+
+    def rot(self, n=1):
+        """Rotates the grid 90 degrees clockwise n times (same semantics as helpers.rot)."""
+        match n & 3:
+            case 0:
+                return self._new(bytearray(self.data), self.width, self.height)
+            case 1:
+                return self.flip().transpose()  # CW
+            case 2:
+                return self._new(bytearray(self.data[::-1]), self.width, self.height)  # 180
+            case 3:
+                return self.transpose().flip()  # CCW
+
+
+class SparseGrid:
+    """An unbounded set of cells in any number of dimensions, for infinite grids.
+
+    Every coordinate is biased to be nonnegative and packed into bits-wide fields of a single
+    int, so that a cell is one small int in a set, and a neighbour is just key + delta.
+    Coordinates must stay within [-2**(bits-1), 2**(bits-1)) along every axis.
+    """
+
+    def __init__(self, cells=(), dims=2, bits=None):
+        self.dims = dims
+        self.bits = bits if bits is not None else max(16, 63 // dims)
+        self.bias = 1 << (self.bits - 1)
+        self.mask = (1 << self.bits) - 1
+        self.origin = self.pack_delta([self.bias] * dims)
+        self.keys = set()
+        self.deltas = {
+            diagonal: [self.pack_delta(d) for d in directions(dims, diagonal)]
+            for diagonal in (False, True)
+        }
+        for cell in cells:
+            self.add(cell)
+
+    @classmethod
+    def from_grid(cls, grid, alive='#', dims=2, bits=None):
+        """The cells equal to alive in a 2D grid (a str or list of rows), as (r, c, 0, ...)."""
+        if isinstance(grid, str):
+            grid = grid.rstrip('\n').split('\n')
+        pad = (0,) * (dims - 2)
+        return cls(((r, c) + pad for r, row in enumerate(grid)
+                    for c, x in enumerate(row) if x == alive), dims, bits)
+
+    def pack_delta(self, delta):
+        return sum(d << (self.bits * i) for i, d in enumerate(delta))
+
+    def pack(self, cell):
+        """The key of a cell, raising ValueError if it doesn't fit (rather than corrupting it)."""
+        bias = self.bias
+        if len(cell) != self.dims:
+            raise ValueError(f'expected a {self.dims}D cell, got {cell!r}')
+        for x in cell:
+            if not -bias <= x < bias:
+                raise ValueError(f'coordinate {x} of {cell!r} is outside [{-bias}, {bias}), '
+                                 f'the range of {self.bits}-bit fields')
+        return self.origin + self.pack_delta(cell)
+
+    def unpack(self, key):
+        bits, mask, bias = self.bits, self.mask, self.bias
+        return tuple(((key >> (bits * i)) & mask) - bias for i in range(self.dims))
+
+    def _like(self, keys):
+        grid = SparseGrid.__new__(SparseGrid)
+        grid.__dict__.update(self.__dict__)
+        grid.keys = keys
+        return grid
+
+    def copy(self):
+        return self._like(set(self.keys))
+
+    """Set-like interface, on coordinate tuples"""
+
+    def add(self, cell):
+        self.keys.add(self.pack(cell))
+
+    def discard(self, cell):
+        try:
+            self.keys.discard(self.pack(cell))
+        except ValueError:
+            pass
+
+    def __contains__(self, cell):
+        try:
+            return self.pack(cell) in self.keys
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return map(self.unpack, self.keys)
+
+    def __eq__(self, other):
+        if not isinstance(other, SparseGrid):
+            return NotImplemented
+        return self.dims == other.dims and self.bits == other.bits and self.keys == other.keys
+
+    def __hash__(self):
+        return hash(frozenset(self.keys))
+
+    def __repr__(self):
+        return f'SparseGrid({len(self)} cells, {self.dims}D)'
+
+    """Neighbours"""
+
+    def neighbors(self, cell, diagonal=True):
+        """Yields every neighbour of a cell (in 3**dims - 1 or 2 * dims directions)."""
+        key = self.pack(cell)
+        return (self.unpack(key + d) for d in self.deltas[diagonal])
+
+    def neighbor_counts(self, diagonal=True):
+        """Counts how many live neighbours every cell next to a live cell has, keyed by packed ids."""
+        # One C-level pass over the live cells per direction, instead of a Python loop per cell
+        counts, keys = Counter(), self.keys
+        for d in self.deltas[diagonal]:
+            counts.update(map(d.__add__, keys))
+        return counts
+
+    def step(self, born=(3,), survive=(2, 3), diagonal=True):
+        """Returns the next generation under a Life-like rule."""
+        born, survive, keys = frozenset(born), frozenset(survive), self.keys
+        counts = self.neighbor_counts(diagonal)
+        return self._like({k for k, n in counts.items() if n in (survive if k in keys else born)})
+
+    """Bounding box and dense export"""
+
+    def bounds(self):
+        """Returns (lo, hi) tuples such that every cell has lo[i] <= cell[i] <= hi[i]."""
+        if not self.keys:
+            raise ValueError('bounds() of an empty SparseGrid')
+        bits, mask, bias = self.bits, self.mask, self.bias
+        lo, hi = [], []
+        for i in range(self.dims):
+            axis = {(k >> (bits * i)) & mask for k in self.keys}
+            lo.append(min(axis) - bias)
+            hi.append(max(axis) - bias)
+        return tuple(lo), tuple(hi)
+
+    def window(self, lo=None, hi=None):
+        """Export the cells within [lo, hi] (the bounding box by default) as nested 0/1 lists."""
+        if lo is None or hi is None:
+            box_lo, box_hi = self.bounds()
+            lo = box_lo if lo is None else lo
+            hi = box_hi if hi is None else hi
+
+        def build(axis, prefix):
+            if axis == self.dims:
+                return int(self.pack(prefix) in self.keys)
+            return [build(axis + 1, prefix + (x,)) for x in range(lo[axis], hi[axis] + 1)]
+        return build(0, ())
+
+    def __str__(self):
+        if self.dims != 2:
+            raise ValueError('only 2D SparseGrids can be rendered')
+        if not self.keys:
+            return ''
+        return '\n'.join(''.join('#' if x else '.' for x in row) for row in self.window())
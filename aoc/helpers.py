@@ -1,14 +1,17 @@
+from array import array
 from bisect import *
 from collections import *
 from collections.abc import Iterable
 from functools import *
 from heapq import *
 from itertools import *
-from parse import parse, search
 from copy import deepcopy
 from math import prod, gcd, lcm
+from aoc.lazy import LazyModule
 import re, os, sys
 
+_parse = LazyModule('parse')
+
 D4 = [(1, 0), (0, 1), (-1, 0), (0, -1)]
 D8 = [(1, 1), (1, 0), (1, -1), (0, -1), (0, 1), (-1, -1), (-1, 0), (-1, 1)]
 
@@ -27,12 +30,7 @@ def adj(iterable, size=2):
 
 def comb(iterable, size=1, step=None, partial=False):
     """Split an iterable into chunks of a specified size/step."""
-    if size <= 0:
-        raise ValueError('size argument must be positive')
-    if step is None or step == 0:
-        step = size
-    if step < 0:
-        raise ValueError('step argument must be nonnegative')
+    step = _comb_step(size, step)
     if not isinstance(iterable, str):
         iterable = tuple(iterable)
     result = []
@@ -43,6 +41,34 @@ def comb(iterable, size=1, step=None, partial=False):
         result.append(iterable[i:i+size])
     return result
 
+def _comb_step(size, step):
+    """Validates the size/step arguments of comb() and icomb(), returning the actual step."""
+    if size <= 0:
+        raise ValueError('size argument must be positive')
+    if step is None or step == 0:
+        step = size
+    if step < 0:
+        raise ValueError('step argument must be nonnegative')
+    return step
+
+def compile_format(format, extra_types=None, case_sensitive=False):
+    """parse.compile(), memoized in a bounded cache (unless there are extra_types, which can't be
+    hashed), so that parsing line after line with the same format only compiles it once."""
+    if extra_types is not None:
+        return _parse.compile(format, extra_types, case_sensitive)
+    return _compile_format(format, case_sensitive)
+
+@lru_cache(maxsize=256)
+def _compile_format(format, case_sensitive):
+    return _parse.compile(format, case_sensitive=case_sensitive)
+
+def directions(dims, diagonal=True):
+    """Generalizes D4 (diagonal=False) and D8 to any number of dimensions."""
+    if not diagonal:
+        return [tuple(d if i == j else 0 for j in range(dims))
+                for i in range(dims) for d in (1, -1)]
+    return [d for d in product((-1, 0, 1), repeat=dims) if any(d)]
+
 def eye(n):
     """Returns the n x n identity matrix."""
     return [[0] * i + [1] + [0] * (n - i - 1) for i in range(n)]
@@ -54,7 +80,88 @@ def fill(dims, k=0):
     elif len(dims) == 2:
         return [[k] * dims[1] for _ in range(dims[0])]
     else:
-        return [fill(dims[1:]) for _ in range(dims[0])]
+        return [fill(dims[1:], k) for _ in range(dims[0])]
+
+def fastforward(state, step, n, key=None, max_states=10**6):
+    """Returns the state after applying step() n times, skipping ahead once a cycle is found.
+
+    Only a 64-bit fingerprint, hash(key(state)) (freeze() by default), is remembered per state
+    seen, so a repeated fingerprint is confirmed by stepping once around the would-be cycle before
+    jumping ahead. Past max_states fingerprints, it switches to Brent's algorithm, which needs
+    O(1) memory at the cost of extra steps. step() must return a new state rather than mutate its
+    argument.
+    """
+    if key is None:
+        key = freeze
+    seen = {}
+    i = 0
+    while i < n:
+        frozen = key(state)
+        fp = hash(frozen)
+        if fp in seen:
+            period = i - seen[fp]
+            if i + period >= n:
+                for _ in range(n - i):
+                    state = step(state)
+                return state
+            for _ in range(period):
+                state = step(state)
+            i += period
+            if key(state) == frozen:
+                for _ in range((n - i) % period):
+                    state = step(state)
+                return state
+            # A hash collision: carry on from here, with the fingerprint pointing at the latest
+            # state that had it
+            seen[fp] = i - period
+            continue
+        if len(seen) >= max_states:
+            break
+        seen[fp] = i
+        state = step(state)
+        i += 1
+    else:
+        return state
+
+    seen.clear()
+    remaining = n - i
+    cycle = find_cycle(state, step, limit=remaining)
+    if cycle is not None:
+        mu, period = cycle
+        if remaining > mu:
+            remaining = mu + (remaining - mu) % period
+    for _ in range(remaining):
+        state = step(state)
+    return state
+
+def find_cycle(state, step, limit=None):
+    """Brent's cycle detection: returns (mu, period) such that the sequence state, step(state),
+    ... repeats every period steps from index mu on, or None if no cycle shows up within limit
+    steps. States are compared with ==, so only O(1) of them are kept around.
+    """
+    power = period = 1
+    tortoise, hare = state, step(state)
+    steps = 1
+    while tortoise != hare:
+        if limit is not None and steps > limit:
+            return None
+        if power == period:
+            tortoise = hare
+            power *= 2
+            period = 0
+        hare = step(hare)
+        period += 1
+        steps += 1
+
+    tortoise = hare = state
+    for _ in range(period):
+        hare = step(hare)
+    mu = 0
+    while tortoise != hare:
+        tortoise = step(tortoise)
+        hare = step(hare)
+        mu += 1
+    return mu, period
 
 def flat(x):
     """Flattens a list recursively"""
@@ -63,6 +170,90 @@ def flat(x):
     else:
         return [x]
 
+def freeze(x):
+    """Recursively converts lists, dicts, sets, arrays and grids into hashable equivalents."""
+    if isinstance(x, (list, tuple)):
+        return tuple(map(freeze, x))
+    if isinstance(x, dict):
+        return frozenset((k, freeze(v)) for k, v in x.items())
+    if isinstance(x, set):
+        return frozenset(map(freeze, x))
+    if isinstance(x, bytearray):
+        return bytes(x)
+    if isinstance(x, array):
+        return tuple(x)
+    if hasattr(x, 'freeze'):
+        return x.freeze()
+    return x
+
+def iadj(iterable, size=2):
+    """A lazy adj(), see icomb()."""
+    return icomb(iterable, size, 1)
+
+def icomb(iterable, size=1, step=None, partial=False):
+    """A lazy comb(), yielding one chunk at a time instead of building a list.
+
+    str chunks are slices, bytes-like chunks are zero-copy memoryview slices, and any other
+    iterable (including generators) is consumed one element at a time into tuples, so memory
+    stays at a single window no matter how long the input is.
+    """
+    step = _comb_step(size, step)
+    if isinstance(iterable, (bytes, bytearray, memoryview)):
+        iterable = memoryview(iterable)
+    elif not isinstance(iterable, str) and not (partial and isinstance(iterable, (list, tuple))):
+        return _windows(iter(iterable), size, step, partial)
+    high = len(iterable)
+    if not partial:
+        high -= size - 1
+    chunks = (iterable[i:i+size] for i in range(0, high, step))
+    return map(tuple, chunks) if isinstance(iterable, list) else chunks
+
+def _windows(it, size, step, partial):
+    if not partial:
+        # Staggered, strided copies of the iterator zipped together, which all runs in C
+        return zip(*(islice(t, i, None, step) for i, t in enumerate(tee(it, size))))
+    return _windows_deque(it, size, step, partial)
+
+def _windows_deque(it, size, step, partial):
+    window = deque()
+    end = object()
+    exhausted = False
+    while True:
+        while not exhausted and len(window) < size:
+            x = next(it, end)
+            if x is end:
+                exhausted = True
+            else:
+                window.append(x)
+        if len(window) < size and not (partial and window):
+            return
+        yield tuple(window)
+        # Slide forward, skipping over elements if the step is larger than the window
+        for _ in range(step):
+            if window:
+                window.popleft()
+            elif exhausted or next(it, end) is end:
+                exhausted = True
+                break
+
+def memo(func=None, *, maxsize=None, maxbytes=None, policy='lru', persist=None, stats=False):
+    """A memoization decorator that works with unhashable (list/dict/set) arguments.
+
+    Use as @memo, or e.g. @memo(maxsize=10**6, policy='lfu') to bound the cache by the number of
+    entries (or by maxbytes, an estimate of its memory usage), evicting the least recently or least
+    frequently used entries. stats=True reports hits/misses/evictions on exit, and persist=<name>
+    keeps the cache on disk across runs (e.g. to carry part 1 results over into part 2). Under
+    template.exec(), every sample and the real input get a cache file of their own.
+    """
+    def decorator(func):
+        return Memo(func, maxsize, maxbytes, policy, persist, stats)
+    return decorator if func is None else decorator(func)
+
+def parse(format, string, extra_types=None, evaluate_result=True, case_sensitive=False):
+    """An alias of parse.parse(), with the compiled format cached (see compile_format())."""
+    parser = compile_format(format, extra_types, case_sensitive)
+    return parser.parse(string, evaluate_result=evaluate_result)
+
 def rot(grid, n=1):
     """Rotates a grid 90 degrees clockwise n times"""
     match n & 3:
@@ -76,6 +267,12 @@ def rot(grid, n=1):
             return list(map(list, zip(*grid)))[::-1]  # CCW
     return list(map(list, zip(*grid[::-1])))
 
+def search(format, string, pos=0, endpos=None, extra_types=None, evaluate_result=True,
+           case_sensitive=False):
+    """An alias of parse.search(), with the compiled format cached (see compile_format())."""
+    parser = compile_format(format, extra_types, case_sensitive)
+    return parser.search(string, pos, endpos, evaluate_result=evaluate_result)
+
 def succ(s):
     """Convenience function for Ruby's String#succ."""
     if not s:
@@ -131,4 +328,266 @@ def succ(s):
         if not is_last:
             break
         i -= 1
-    return typ(s.decode())
\ No newline at end of file
+    return typ(s.decode())
+
+# Lookup tables of succ() by byte: the next byte, whether it carries, the lowest byte of its
+# class (digit, uppercase, lowercase or other), and the byte to prepend after an overflow
+SUCC_NEXT = bytes(48 if c == 57 else 65 if c == 90 else 97 if c == 122 else (c + 1) % 256
+                  for c in range(256))
+SUCC_CARRY = bytes(c in (57, 90, 122, 255) for c in range(256))
+SUCC_MIN = bytes(48 if 48 <= c < 58 else 65 if 65 <= c < 91 else 97 if 97 <= c < 123 else 0
+                 for c in range(256))
+SUCC_PREPEND = bytes(49 if c == 48 else c if c in (65, 97) else 1 for c in range(256))
+
+def _succ_buffer(s):
+    """The bytearray of s and the index of its rightmost alphanumeric char (where succ() starts)."""
+    if any(ord(c) >= 128 for c in s):
+        raise ValueError('Cannot encode string with non-ascii characters')
+    buf = bytearray(s, 'utf-8')
+    i = len(buf) - 1
+    while i >= 0 and SUCC_MIN[buf[i]] == 0:
+        i -= 1
+    return buf, i
+
+def _succ_step(buf, i):
+    """Increment buf in place at index i, carrying to the left like succ(). Returns whether a
+    character had to be prepended."""
+    while i >= 0:
+        c = buf[i]
+        buf[i] = SUCC_NEXT[c]
+        if not SUCC_CARRY[c]:
+            return False
+        i -= 1
+    buf.insert(0, SUCC_PREPEND[buf[0]])
+    return True
+
+def succ_iter(s, predicate=None):
+    """Yields succ(s), succ(succ(s)), ... endlessly, incrementing a single buffer in place.
+
+    With a predicate, only the values it returns True for are yielded. It can also return the
+    index k of a character that rules out every string starting with s[:k+1] (e.g. of a
+    forbidden letter), which are then all skipped at once instead of one by one.
+    """
+    buf, i = _succ_buffer(s)
+    if i < 0:
+        # Nothing to increment, as in succ()
+        yield from repeat(s)
+    typ = type(s)
+    start = i
+    while True:
+        if _succ_step(buf, start):
+            i += 1
+        start = i
+        x = buf.decode() if typ is str else typ(buf.decode())
+        if predicate is None:
+            yield x
+            continue
+        result = predicate(x)
+        if result is True:
+            yield x
+        elif result is not False and result is not None and result < i:
+            # Continue from the smallest string after every one with the prefix x[:result+1]
+            for j in range(result + 1, i + 1):
+                buf[j] = SUCC_MIN[buf[j]]
+            start = result
+
+def succ_n(s, n):
+    """Returns succ() applied n times to s, as arithmetic on the string instead of n steps."""
+    if not s or n <= 0:
+        return s
+    typ = type(s)
+    buf, i = _succ_buffer(s)
+    if i < 0:
+        return s
+    if any(SUCC_MIN[c] == 0 for c in buf[:i]):
+        # Other characters don't keep to one radix as they get incremented, so step through
+        for _ in range(n):
+            if _succ_step(buf, i):
+                i += 1
+        return typ(buf.decode())
+
+    # Every character left of i is a digit in base 10 or 26, with a fixed lowest byte
+    carry = n
+    for j in range(i, -1, -1):
+        low = SUCC_MIN[buf[j]]
+        radix = 10 if low == 48 else 26
+        carry, digit = divmod(buf[j] - low + carry, radix)
+        buf[j] = low + digit
+        if not carry:
+            return typ(buf.decode())
+    # Overflowing prepends a character, which is itself a digit incremented by the rest
+    low = SUCC_MIN[buf[0]]
+    radix = 10 if low == 48 else 26
+    head = []
+    value = SUCC_PREPEND[low] - low + carry - 1
+    while True:
+        carry, digit = divmod(value, radix)
+        head.append(low + digit)
+        if not carry:
+            break
+        value = SUCC_PREPEND[low] - low + carry - 1
+    return typ((bytes(reversed(head)) + buf).decode())
+
+
+class Memo:
+    """The cache behind @memo; see memo() for the available options."""
+
+    persist_dir = '.aoc-memo'
+    # Which input persisted caches belong to (set by template.exec), or False to not persist
+    persist_scope = None
+    persisted = []
+
+    def __init__(self, func, maxsize=None, maxbytes=None, policy='lru', persist=None, stats=False):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError("policy argument must either be 'lru' or 'lfu'")
+        update_wrapper(self, func)
+        self.func = func
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.policy = policy
+        self.hits = self.misses = self.evictions = 0
+        self.nbytes = 0
+        self.cache = {}
+        # LFU bookkeeping: key -> use count, and use count -> keys in insertion order
+        self.freq = {}
+        self.buckets = defaultdict(OrderedDict)
+        self.min_freq = 0
+
+        import atexit
+        self.persist_name = None
+        if persist is not None:
+            self.persist_name = func.__qualname__ if persist is True else persist
+            Memo.persisted.append(self)
+            self.load()
+            atexit.register(self.save)
+        if stats:
+            atexit.register(self.report)
+
+    def make_key(self, args, kwargs):
+        key = tuple(map(freeze, args))
+        if kwargs:
+            key += (frozenset((k, freeze(v)) for k, v in kwargs.items()),)
+        return key
+
+    def __call__(self, *args, **kwargs):
+        key = self.make_key(args, kwargs)
+        try:
+            result = self.cache[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            self.touch(key)
+            return result
+
+        self.misses += 1
+        result = self.func(*args, **kwargs)
+        self.insert(key, result)
+        return result
+
+    def __get__(self, obj, objtype=None):
+        return self if obj is None else partial(self, obj)
+
+    def touch(self, key):
+        if self.policy == 'lru':
+            if self.maxsize is not None or self.maxbytes is not None:
+                self.cache[key] = self.cache.pop(key)
+            return
+        count = self.freq[key]
+        bucket = self.buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[count]
+            if self.min_freq == count:
+                self.min_freq = count + 1
+        self.freq[key] = count + 1
+        self.buckets[count + 1][key] = None
+
+    def insert(self, key, result):
+        if key in self.cache or self.maxsize == 0:
+            return
+        size = self.sizeof(key, result) if self.maxbytes is not None else 0
+        # Make room first: under LFU, the new entry would otherwise be the first one evicted
+        while self.cache and ((self.maxsize is not None and len(self.cache) >= self.maxsize)
+                              or (self.maxbytes is not None and self.nbytes + size > self.maxbytes)):
+            self.evict()
+        self.cache[key] = result
+        self.nbytes += size
+        if self.policy == 'lfu':
+            self.freq[key] = 1
+            self.buckets[1][key] = None
+            self.min_freq = 1
+
+    def evict(self):
+        if self.policy == 'lru':
+            # Dicts remember insertion order, and touch() moves used keys to the end
+            key = next(iter(self.cache))
+        else:
+            bucket = self.buckets[self.min_freq]
+            key, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self.buckets[self.min_freq]
+                self.min_freq = min(self.buckets, default=0)
+            del self.freq[key]
+        result = self.cache.pop(key)
+        if self.maxbytes is not None:
+            self.nbytes -= self.sizeof(key, result)
+        self.evictions += 1
+
+    @staticmethod
+    def sizeof(key, result):
+        """A rough (shallow) estimate of the memory taken up by a cache entry."""
+        return sys.getsizeof(key) + sum(map(sys.getsizeof, key)) + sys.getsizeof(result)
+
+    def cache_info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self.cache), 'nbytes': self.nbytes if self.maxbytes is not None else None}
+
+    def cache_clear(self):
+        self.cache.clear()
+        self.freq.clear()
+        self.buckets.clear()
+        self.nbytes = 0
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        print(f'[memo] {self.__qualname__}: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), '
+              f'{self.evictions} evictions, {len(self.cache)} entries', file=sys.stderr)
+
+    @property
+    def persist_path(self):
+        if self.persist_scope is None:
+            return os.path.join(self.persist_dir, f'{self.persist_name}.pickle')
+        return os.path.join(self.persist_dir, self.persist_scope, f'{self.persist_name}.pickle')
+
+    @classmethod
+    def rescope(cls, scope):
+        """Switch every persisted cache over to the file of another scope (e.g. one input of a
+        puzzle), or stop persisting them with scope=False."""
+        cls.persist_scope = scope
+        for memo in cls.persisted:
+            memo.cache_clear()
+            memo.load()
+
+    def load(self):
+        if self.persist_scope is False:
+            return
+        import pickle
+        try:
+            with open(self.persist_path, 'rb') as f:
+                entries = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return
+        for key, result in entries.items():
+            self.insert(key, result)
+
+    def save(self):
+        if self.persist_scope is False:
+            return
+        import pickle
+        os.makedirs(os.path.dirname(self.persist_path), exist_ok=True)
+        tmp_path = self.persist_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.cache, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.persist_path)
@@ -0,0 +1,21 @@
+import importlib
+
+
+class LazyModule:
+    """A stand-in for a module that is only imported upon first attribute access."""
+
+    def __init__(self, name):
+        self.__name__ = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        value = getattr(self._module, attr)
+        # Cache the attribute so that subsequent lookups skip __getattr__ entirely
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self.__name__!r} ({state})>'
@@ -0,0 +1,144 @@
+from collections import Counter
+import atexit
+import os
+import signal
+import sys
+import time
+
+import aoc.types
+
+top_n = 15
+
+
+def is_library(filename):
+    """Whether time/memory attributed to this file is overhead from the xstr/xlist wrappers."""
+    return filename in (aoc.types.__file__, aoc.types.WRAPPER_FILENAME)
+
+
+def format_share(label, part, total, unit):
+    share = part / total * 100 if total else 0
+    return f'{label}: {part:.3f}{unit} of {total:.3f}{unit} ({share:.1f}%)'
+
+
+class CProfiler:
+    """Deterministic profiling through cProfile, reporting the hottest functions."""
+
+    def start(self):
+        import cProfile
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop(self):
+        import pstats
+        self.profiler.disable()
+        stats = pstats.Stats(self.profiler, stream=sys.stderr)
+        stats.sort_stats('tottime').print_stats(top_n)
+        total = library = 0
+        for (filename, _, _), (_, _, tottime, _, _) in stats.stats.items():
+            total += tottime
+            if is_library(filename):
+                library += tottime
+        print(format_share('Time spent inside aoc.types', library, total, 's'), file=sys.stderr)
+
+
+class SamplingProfiler:
+    """A low-overhead statistical profiler, sampling the running frame on a CPU-time timer."""
+
+    interval = 0.001
+
+    def start(self):
+        self.lines = Counter()
+        self.functions = Counter()
+        self.samples = 0
+        signal.signal(signal.SIGPROF, self.handle)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def handle(self, _, frame):
+        self.samples += 1
+        code = frame.f_code
+        self.lines[code.co_filename, frame.f_lineno, code.co_name] += 1
+        # Count every function on the stack once, for inclusive timings
+        seen = set()
+        while frame is not None:
+            code = frame.f_code
+            if code not in seen:
+                seen.add(code)
+                self.functions[code.co_filename, code.co_firstlineno, code.co_name] += 1
+            frame = frame.f_back
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+        total = self.samples
+        print(f'{total} samples every {self.interval * 1000:g} ms of CPU time', file=sys.stderr)
+        print('Hottest lines (self):', file=sys.stderr)
+        for (filename, lineno, name), count in self.lines.most_common(top_n):
+            print(f'  {count / total * 100:5.1f}%  {filename}:{lineno} ({name})', file=sys.stderr)
+        print('Hottest functions (inclusive):', file=sys.stderr)
+        for (filename, lineno, name), count in self.functions.most_common(top_n):
+            print(f'  {count / total * 100:5.1f}%  {filename}:{lineno} ({name})', file=sys.stderr)
+        library = sum(count for (filename, _, _), count in self.lines.items() if is_library(filename))
+        print(format_share('Samples inside aoc.types', library * self.interval,
+                           total * self.interval, 's'), file=sys.stderr)
+
+
+class AllocProfiler:
+    """Allocation tracking through tracemalloc, reporting the peak and the top allocation sites."""
+
+    def start(self):
+        import tracemalloc
+        self.tracemalloc = tracemalloc
+        tracemalloc.start()
+
+    def stop(self):
+        snapshot = self.tracemalloc.take_snapshot()
+        current, peak = self.tracemalloc.get_traced_memory()
+        self.tracemalloc.stop()
+        print(f'Peak traced memory: {peak / 2**20:.2f} MiB (current: {current / 2**20:.2f} MiB)',
+              file=sys.stderr)
+        print('Top allocation sites (still alive):', file=sys.stderr)
+        for stat in snapshot.statistics('lineno')[:top_n]:
+            print(f'  {stat.size / 1024:10.1f} KiB  {stat.count:8} blocks  {stat.traceback}',
+                  file=sys.stderr)
+        stats = snapshot.statistics('filename')
+        total = sum(stat.size for stat in stats)
+        library = sum(stat.size for stat in stats if is_library(stat.traceback[0].filename))
+        print(format_share('Memory allocated inside aoc.types', library / 2**20, total / 2**20,
+                           ' MiB'), file=sys.stderr)
+
+
+profilers = {
+    'cprofile': CProfiler,
+    'sample': SamplingProfiler,
+    'alloc': AllocProfiler,
+}
+
+
+def get_profile_mode():
+    """Read the profiling mode from a --profile[=mode] flag (removed from argv) or AOC_PROFILE."""
+    mode = os.environ.get('AOC_PROFILE')
+    for i, arg in enumerate(sys.argv[1:], 1):
+        if arg == '--profile' or arg.startswith('--profile='):
+            mode = arg.partition('=')[2] or 'cprofile'
+            del sys.argv[i]
+            break
+    if not mode or mode == '0':
+        return None
+    if mode == '1':
+        return 'cprofile'
+    if mode not in profilers:
+        raise ValueError(f'profile mode must be one of {", ".join(profilers)}, not {mode!r}')
+    return mode
+
+
+def start_profiling(mode):
+    """Start profiling the rest of the program, with a report printed to stderr upon exit."""
+    profiler = profilers[mode]()
+    start = time.perf_counter()
+
+    def report():
+        profiler.stop()
+        print(f'Total wall time: {time.perf_counter() - start:.3f}s', file=sys.stderr)
+
+    atexit.register(report)
+    profiler.start()
@@ -0,0 +1,291 @@
+__all__ = [
+    'IntervalMap',
+    'RangeSet',
+]
+
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+def merged(pairs):
+    """Sorts and coalesces (lo, hi) pairs into two parallel arrays of disjoint intervals."""
+    starts, ends = array('q'), array('q')
+    for lo, hi in sorted(pairs):
+        if lo >= hi:
+            continue
+        if ends and lo <= ends[-1]:
+            if hi > ends[-1]:
+                ends[-1] = hi
+        else:
+            starts.append(lo)
+            ends.append(hi)
+    return starts, ends
+
+
+class RangeSet:
+    """A set of integers stored as sorted, disjoint half-open intervals [lo, hi).
+
+    The intervals live in two parallel array('q')s, so millions of them cost 16 bytes each.
+    Set operations are linear merges of the two sorted interval lists.
+    """
+
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, pairs=()):
+        self.starts, self.ends = merged(pairs)
+
+    @classmethod
+    def closed(cls, pairs):
+        """Build a RangeSet from inclusive [lo, hi] pairs."""
+        return cls((lo, hi + 1) for lo, hi in pairs)
+
+    @classmethod
+    def _from_arrays(cls, starts, ends):
+        rs = cls.__new__(cls)
+        rs.starts, rs.ends = starts, ends
+        return rs
+
+    def copy(self):
+        return RangeSet._from_arrays(array('q', self.starts), array('q', self.ends))
+
+    """Queries"""
+
+    def __len__(self):
+        """The number of disjoint intervals."""
+        return len(self.starts)
+
+    @property
+    def total(self):
+        """The number of integers covered."""
+        return sum(self.ends) - sum(self.starts)
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __eq__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        return self.starts == other.starts and self.ends == other.ends
+
+    def __repr__(self):
+        shown = ', '.join(f'[{lo}, {hi})' for lo, hi in zip(self.starts[:8], self.ends[:8]))
+        more = ', ...' if len(self) > 8 else ''
+        return f'RangeSet({shown}{more})'
+
+    def __contains__(self, x):
+        i = bisect_right(self.starts, x) - 1
+        return i >= 0 and x < self.ends[i]
+
+    def covers(self, lo, hi):
+        """Whether every integer in [lo, hi) is in the set."""
+        i = bisect_right(self.starts, lo) - 1
+        return lo >= hi or (i >= 0 and hi <= self.ends[i])
+
+    def overlaps(self, lo, hi):
+        """Whether any integer in [lo, hi) is in the set."""
+        i = bisect_right(self.ends, lo)
+        return lo < hi and i < len(self.starts) and self.starts[i] < hi
+
+    @property
+    def min(self):
+        return self.starts[0]
+
+    @property
+    def max(self):
+        return self.ends[-1] - 1
+
+    """Updates"""
+
+    def add(self, lo, hi):
+        """Add [lo, hi) to the set in place."""
+        if lo >= hi:
+            return
+        starts, ends = self.starts, self.ends
+        # Every interval touching [lo, hi) gets replaced by their union
+        i = bisect_left(ends, lo)
+        j = bisect_right(starts, hi)
+        if i < j:
+            lo = min(lo, starts[i])
+            hi = max(hi, ends[j - 1])
+        starts[i:j] = array('q', [lo])
+        ends[i:j] = array('q', [hi])
+
+    def remove(self, lo, hi):
+        """Remove [lo, hi) from the set in place."""
+        if lo >= hi:
+            return
+        starts, ends = self.starts, self.ends
+        i = bisect_right(ends, lo)
+        j = bisect_left(starts, hi)
+        if i >= j:
+            return
+        new_starts, new_ends = array('q'), array('q')
+        if starts[i] < lo:
+            new_starts.append(starts[i])
+            new_ends.append(lo)
+        if ends[j - 1] > hi:
+            new_starts.append(hi)
+            new_ends.append(ends[j - 1])
+        starts[i:j] = new_starts
+        ends[i:j] = new_ends
+
+    """Set operations"""
+
+    def __or__(self, other):
+        a_starts, a_ends, b_starts, b_ends = self.starts, self.ends, other.starts, other.ends
+        starts, ends = array('q'), array('q')
+        i = j = 0
+        n, m = len(a_starts), len(b_starts)
+        while i < n or j < m:
+            if j >= m or (i < n and a_starts[i] <= b_starts[j]):
+                lo, hi = a_starts[i], a_ends[i]
+                i += 1
+            else:
+                lo, hi = b_starts[j], b_ends[j]
+                j += 1
+            if ends and lo <= ends[-1]:
+                if hi > ends[-1]:
+                    ends[-1] = hi
+            else:
+                starts.append(lo)
+                ends.append(hi)
+        return RangeSet._from_arrays(starts, ends)
+
+    def __and__(self, other):
+        a_starts, a_ends, b_starts, b_ends = self.starts, self.ends, other.starts, other.ends
+        starts, ends = array('q'), array('q')
+        i = j = 0
+        n, m = len(a_starts), len(b_starts)
+        while i < n and j < m:
+            lo = max(a_starts[i], b_starts[j])
+            hi = min(a_ends[i], b_ends[j])
+            if lo < hi:
+                starts.append(lo)
+                ends.append(hi)
+            if a_ends[i] < b_ends[j]:
+                i += 1
+            else:
+                j += 1
+        return RangeSet._from_arrays(starts, ends)
+
+    def __sub__(self, other):
+        b_starts, b_ends = other.starts, other.ends
+        starts, ends = array('q'), array('q')
+        j, m = 0, len(b_starts)
+        for lo, hi in zip(self.starts, self.ends):
+            while j < m and b_ends[j] <= lo:
+                j += 1
+            k = j
+            while k < m and b_starts[k] < hi:
+                if b_starts[k] > lo:
+                    starts.append(lo)
+                    ends.append(b_starts[k])
+                lo = max(lo, b_ends[k])
+                k += 1
+            if lo < hi:
+                starts.append(lo)
+                ends.append(hi)
+        return RangeSet._from_arrays(starts, ends)
+
+    def __xor__(self, other):
+        return (self | other) - (self & other)
+
+    union = __or__
+    intersection = __and__
+    difference = __sub__
+    symmetric_difference = __xor__
+
+
+class IntervalMap:
+    """A piecewise function over the integers, mapping disjoint intervals [lo, hi) to values.
+
+    Stored as three parallel arrays sorted by start. Integers outside every interval are
+    unmapped (the default for translate() is to leave them unchanged).
+    """
+
+    __slots__ = ('starts', 'ends', 'values')
+
+    def __init__(self, entries=()):
+        entries = sorted(entries)
+        self.starts, self.ends, self.values = array('q'), array('q'), []
+        for lo, hi, value in entries:
+            if lo >= hi:
+                continue
+            if self.ends and lo < self.ends[-1]:
+                raise ValueError(f'overlapping intervals in IntervalMap: [{lo}, {hi})')
+            self.starts.append(lo)
+            self.ends.append(hi)
+            self.values.append(value)
+
+    @classmethod
+    def from_offsets(cls, triples):
+        """Build a translation table from (destination, source, length) triples, as in the
+        almanac-style maps of AoC 2023 day 5: [source, source + length) gets shifted by
+        destination - source."""
+        return cls((src, src + length, dst - src) for dst, src, length in triples)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends, self.values)
+
+    def __repr__(self):
+        return f'IntervalMap({len(self)} intervals)'
+
+    def index(self, x):
+        """The index of the interval containing x, or -1."""
+        i = bisect_right(self.starts, x) - 1
+        return i if i >= 0 and x < self.ends[i] else -1
+
+    def __getitem__(self, x):
+        i = self.index(x)
+        if i < 0:
+            raise KeyError(x)
+        return self.values[i]
+
+    def get(self, x, default=None):
+        i = self.index(x)
+        return self.values[i] if i >= 0 else default
+
+    def __contains__(self, x):
+        return self.index(x) >= 0
+
+    def translate(self, x):
+        """Shift x by the offset of its interval (treating the values as offsets)."""
+        i = self.index(x)
+        return x + self.values[i] if i >= 0 else x
+
+    def translate_ranges(self, ranges):
+        """Translate a whole RangeSet at once, splitting its intervals at the map's boundaries.
+
+        Runs in O((n + m) log(n + m)): a linear sweep over both sorted interval lists, followed by
+        re-sorting the shifted pieces. Any other iterable of (lo, hi) pairs is turned into a
+        RangeSet first, since the sweep needs them sorted and disjoint.
+        """
+        if not isinstance(ranges, RangeSet):
+            ranges = RangeSet(ranges)
+        m_starts, m_ends, m_values = self.starts, self.ends, self.values
+        m = len(m_starts)
+        pieces = []
+        j = 0
+        for lo, hi in ranges:
+            while j < m and m_ends[j] <= lo:
+                j += 1
+            k = j
+            while lo < hi and k < m and m_starts[k] < hi:
+                if m_starts[k] > lo:
+                    pieces.append((lo, m_starts[k]))
+                    lo = m_starts[k]
+                top = min(hi, m_ends[k])
+                offset = m_values[k]
+                pieces.append((lo + offset, top + offset))
+                lo = top
+                k += 1
+            if lo < hi:
+                pieces.append((lo, hi))
+        return RangeSet(pieces)
@@ -0,0 +1,101 @@
+__all__ = [
+    'InputStream',
+]
+
+
+from aoc.types import SINT_PATTERN, UINT_PATTERN, xiter, xstr
+import io
+
+
+class InputStream:
+    """Lazily reads an input (a file, or a str) piece by piece, in constant memory.
+
+    Every pass (.lines, .blocks, .ints, ...) reopens the input and yields its pieces as they are
+    read, through an xiter, so that vectorized calls can be chained on it as on an xlist:
+    `day.stream().lines.sints.max`. Pieces match those of `data.rstrip('\\n')`.
+    """
+
+    chunk_size = 1 << 20
+
+    def __init__(self, open):
+        self.open = open
+
+    @classmethod
+    def from_path(cls, path):
+        # newline='\n': split on newlines only, and don't translate anything
+        return cls(lambda: io.open(path, 'r', encoding='utf-8', newline='\n'))
+
+    @classmethod
+    def from_str(cls, data):
+        return cls(lambda: io.StringIO(data, newline='\n'))
+
+    def iter_lines(self):
+        with self.open() as f:
+            blank = 0
+            for line in f:
+                line = line[:-1] if line.endswith('\n') else line
+                # Hold back blank lines, since trailing ones are stripped
+                if not line:
+                    blank += 1
+                    continue
+                for _ in range(blank):
+                    yield xstr()
+                blank = 0
+                yield xstr(line)
+
+    def iter_blocks(self):
+        block = []
+        for line in self.iter_lines():
+            if line or not block:
+                block.append(line)
+            else:
+                yield xstr('\n'.join(block))
+                block = []
+        if block:
+            yield xstr('\n'.join(block))
+
+    def iter_chunks(self):
+        """Yield chunks of roughly chunk_size, none of which ends in the middle of a number."""
+        with self.open() as f:
+            carry = ''
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                chunk = carry + chunk
+                i = len(chunk)
+                while i and chunk[i - 1].isdigit():
+                    i -= 1
+                if i and chunk[i - 1] == '-':
+                    i -= 1
+                carry = chunk[i:]
+                yield chunk[:i]
+            yield carry
+
+    def iter_ints(self, signed=False):
+        findall = (SINT_PATTERN if signed else UINT_PATTERN).findall
+        for chunk in self.iter_chunks():
+            yield from map(int, findall(chunk))
+
+    def __iter__(self):
+        return self.iter_lines()
+
+    @property
+    def lines(self):
+        """Lazily yield every line."""
+        return xiter(self.iter_lines())
+
+    @property
+    def blocks(self):
+        """Lazily yield every block of lines separated by a blank line."""
+        return xiter(self.iter_blocks())
+
+    @property
+    def ints(self):
+        """Lazily yield every *unsigned* integer, as xstr.ints."""
+        return xiter(self.iter_ints())
+
+    @property
+    def sints(self):
+        """Lazily yield every *signed* integer, as xstr.sints."""
+        return xiter(self.iter_ints(signed=True))
@@ -1,13 +1,25 @@
-from aoc.api import coerce, Puzzle
+from aoc.api import capture_answer, coerce, Puzzle
+from aoc.helpers import Memo
+from aoc.profiling import get_profile_mode, start_profiling
+from aoc.stream import InputStream
 from aoc.types import CursedAnnotations, xstr, xlist
 import os
+import selectors
+import signal
+import sys
+import time
 
 class SamplePuzzle:
     def __init__(self, num, data):
         self.num = num
         self.data = data
 
+    def stream(self):
+        return InputStream.from_str(self.data)
+
     def submit(self, answer, _=None):
+        if capture_answer(answer):
+            exit()
         if answer is None:
             return
         answer = coerce(answer)
@@ -16,27 +28,207 @@ class SamplePuzzle:
 
     __call__ = submit
 
-def exec(year, day, samples=None):
+class ForkedPuzzle(Puzzle):
+    """A Puzzle running in a child process whose output is buffered by the parent.
+
+    The terminal is only handed back right before submitting, once the parent has printed the
+    sample results, since submitting asks for confirmation on stdin.
+    """
+
+    def __init__(self, year, day, term_fds, go_fd):
+        super().__init__(year, day)
+        self.term_fds = term_fds
+        self.go_fd = go_fd
+
+    def submit(self, answer, part=None):
+        if self.go_fd is not None:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            # Replacing fds 1/2 closes our end of the output pipe, which signals the parent
+            os.dup2(self.term_fds[0], 1)
+            os.dup2(self.term_fds[1], 2)
+            os.read(self.go_fd, 1)
+            os.close(self.go_fd)
+            self.go_fd = None
+        return super().submit(answer, part)
+
+    __call__ = submit
+
+class ProfiledPuzzle(Puzzle):
+    """The real input, run under a profiler: answers are printed instead of submitted."""
+
+    def submit(self, answer, _=None):
+        if answer is not None:
+            print(f'Output of real input: {coerce(answer)}')
+        exit()
+
+    __call__ = submit
+
+class Run:
+    """Bookkeeping for one forked run (a sample or the real input) inside the parent."""
+
+    def __init__(self, name, pid, fd, timeout):
+        self.name = name
+        self.pid = pid
+        self.fd = fd
+        self.output = bytearray()
+        self.start = time.perf_counter()
+        self.end = None
+        self.deadline = self.start + timeout if timeout else None
+        self.timed_out = False
+        self.summary = None
+        self.exitcode = None
+
+    def close(self):
+        """The run's output pipe reached EOF: it is done, or (for the real input) about to prompt
+        before submitting, which shouldn't count towards its time."""
+        self.end = time.perf_counter()
+        os.close(self.fd)
+
+    def reap(self):
+        _, status, rusage = os.wait4(self.pid, 0)
+        wall = (self.end or time.perf_counter()) - self.start
+        cpu = rusage.ru_utime + rusage.ru_stime
+        self.exitcode = os.waitstatus_to_exitcode(status)
+        if self.timed_out:
+            status = 'timed out'
+        else:
+            status = f'exit {self.exitcode}'
+        self.summary = f'{self.name} | wall {wall * 1000:.1f} ms | cpu {cpu * 1000:.1f} ms | {status}'
+
+    def report(self):
+        write_out(self.output)
+        print('-' * 10 + ' ' + self.summary + ' ' + '-' * 10, flush=True)
+
+def write_out(data):
+    sys.stdout.flush()
+    os.write(1, bytes(data))
+
+def memo_scope(year, day, num=None, sample=None):
+    """The scope of @memo(persist=...) caches for one input, so that runs never share results."""
+    if sample is None:
+        return f'{year}-day{day:02}'
+    import hashlib
+    digest = hashlib.sha1(sample.encode()).hexdigest()[:12]
+    return f'{year}-day{day:02}-sample{num}-{digest}'
+
+def fork_run(name, timeout, keep_terminal=False):
+    """Fork a child with its stdout/stderr redirected into a pipe.
+
+    Returns (run, None) in the parent, and (None, term_fds) in the child, where term_fds are
+    duplicates of the original stdout/stderr if keep_terminal is set.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    r, w = os.pipe()
+    term_fds = (os.dup(1), os.dup(2)) if keep_terminal else None
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        os.dup2(w, 1)
+        os.dup2(w, 2)
+        os.close(w)
+        return None, term_fds
+    os.close(w)
+    for fd in term_fds or ():
+        os.close(fd)
+    return Run(name, pid, r, timeout), None
+
+def exec(year, day, samples=None, timeout=10):
     if samples is None:
         samples = []
 
     # cursed stuff
-    import __main__, sys
+    import __main__
     __main__.__annotations__ = CursedAnnotations([xstr, xlist], __main__.__dict__)
 
+    profile_mode = get_profile_mode()
+
     # 0 = run all, i = run i'th sample
     arg = int(sys.argv[1]) if len(sys.argv) > 1 else 0
 
+    # When profiling, only the chosen input is run (the real one by default)
+    if profile_mode is not None:
+        start_profiling(profile_mode)
+        if arg == 0:
+            Memo.rescope(memo_scope(year, day))
+            return ProfiledPuzzle(year, day)
+
     if arg > 0:
         sample = samples[arg - 1]
+        Memo.rescope(memo_scope(year, day, arg, sample))
         return SamplePuzzle(arg, sample)
 
-    # Do a fork/exec over each sample input, and then finally the real input
+    # Nothing to run concurrently, or `aoc bench` is asking for just the real input
+    if not samples or os.environ.get('AOC_CAPTURE'):
+        Memo.rescope(memo_scope(year, day))
+        return Puzzle(year, day)
+
+    # Fork every sample and the real input so that they run concurrently. Their output is
+    # buffered, and printed in order along with a timing line as soon as each one is done.
+    runs = []
     for num, sample in enumerate(samples):
-        pid = os.fork()
-        if pid != 0:
-            os.waitpid(pid, 0)
-            print('-' * 50)
-        else:
+        run, _ = fork_run(f'sample #{num + 1}', timeout)
+        if run is None:
+            Memo.rescope(memo_scope(year, day, num + 1, sample))
             return SamplePuzzle(num + 1, sample)
-    return Puzzle(year, day)
\ No newline at end of file
+        runs.append(run)
+
+    go_r, go_w = os.pipe()
+    real_run, term_fds = fork_run('real input', None, keep_terminal=True)
+    if real_run is None:
+        os.close(go_w)
+        Memo.rescope(memo_scope(year, day))
+        return ForkedPuzzle(year, day, term_fds, go_r)
+    os.close(go_r)
+    # Only the children save their caches, this process didn't compute anything
+    Memo.rescope(False)
+
+    sel = selectors.DefaultSelector()
+    for run in runs + [real_run]:
+        sel.register(run.fd, selectors.EVENT_READ, run)
+    pending = list(runs)
+
+    while pending:
+        now = time.perf_counter()
+        # Runs that were already reaped wait in pending to be printed in order, and their pids
+        # may since have been reused
+        running = [run for run in pending
+                   if run.summary is None and run.deadline is not None and not run.timed_out]
+        for run in running:
+            if run.deadline <= now:
+                run.timed_out = True
+                os.kill(run.pid, signal.SIGKILL)
+        deadlines = [run.deadline for run in running if not run.timed_out]
+        select_timeout = max(0, min(deadlines) - now) if deadlines else None
+        for key, _ in sel.select(select_timeout):
+            run = key.data
+            chunk = os.read(run.fd, 65536)
+            if chunk:
+                run.output += chunk
+                continue
+            sel.unregister(run.fd)
+            run.close()
+            if run is not real_run:
+                run.reap()
+        # Print finished samples in order, without waiting on the ones after them
+        while pending and pending[0].summary is not None:
+            pending.pop(0).report()
+
+    # All samples are done: stream the real input's output live from here on
+    write_out(real_run.output)
+    if real_run.fd in sel.get_map():
+        sel.unregister(real_run.fd)
+        while chunk := os.read(real_run.fd, 65536):
+            write_out(chunk)
+        real_run.close()
+    sel.close()
+    try:
+        os.write(go_w, b'\x00')
+    except BrokenPipeError:
+        pass
+    os.close(go_w)
+    real_run.output = b''
+    real_run.reap()
+    real_run.report()
+    sys.exit(max(real_run.exitcode, 0))
@@ -1,36 +1,189 @@
-from aoc.helpers import comb, search, succ
-import ast
-import regex
+__all__ = [
+    'CursedAnnotations',
+    'FixedTypeMeta',
+    'LazyVectorizedClassMeta',
+    'VectorizedClassMeta',
+    'ivec',
+    'mint',
+    'to_ivec',
+    'xiter',
+    'xlist',
+    'xstr',
+    # Solutions have always gotten these (lazily imported) modules from `from aoc import *`
+    'ast',
+    'regex',
+]
+
+
+from aoc.grid import Grid
+from aoc.helpers import comb, compile_format, icomb, search, succ
+from aoc.lazy import LazyModule
+from array import array
+from functools import reduce
+from itertools import accumulate, repeat
+import operator
+from operator import attrgetter, methodcaller
+import re
+
+_parse = LazyModule('parse')
+ast = LazyModule('ast')
+regex = LazyModule('regex')
+
+UINT_PATTERN = re.compile(r'\d+')
+SINT_PATTERN = re.compile(r'-?\d+')
 
 
 def mint(arr):
     """Shortcut for converting a list of strings to a list of numbers."""
     return xlist(map(ast.literal_eval, arr))
 
+def scan_ints(s, signed=False):
+    """Extract all integers from a string in a single pass, straight into an xlist of ints
+    (or an ivec, if xstr.int_vectors is set)."""
+    pattern = SINT_PATTERN if signed else UINT_PATTERN
+    if xstr.int_vectors:
+        tokens = pattern.findall(s)
+        # 18 digits always fit in 64 bits, so the common case converts without a temporary list
+        if max(map(len, tokens), default=0) <= 18:
+            return ivec(map(int, tokens))
+        return to_ivec(list(map(int, tokens)))
+    result = xlist()
+    # list.extend() bypasses xlist.__init__, so no per-element isinstance/re-wrap pass happens
+    result.extend(map(int, pattern.findall(s)))
+    return result
+
+def scan_ints_each(strs, signed=False):
+    """scan_ints() of every string in strs (or the vectorized .ints/.sints of nested xlists).
+
+    This is still one findall() per string: scanning them all at once, joined by separators,
+    means splitting the matches back up per string in Python, which costs more than the calls
+    it saves (15-35% slower in benchmarks, from 1000 lines of 3 ints to 20000 lines of 2).
+    """
+    if xstr.int_vectors:
+        return [getattr(s, 'sints' if signed else 'ints') if isinstance(s, xlist)
+                else scan_ints(s, signed) for s in strs]
+    findall = (SINT_PATTERN if signed else UINT_PATTERN).findall
+    result = []
+    append = result.append
+    for s in strs:
+        if isinstance(s, xlist):
+            append(s.sints if signed else s.ints)
+            continue
+        ints = xlist()
+        ints.extend(map(int, findall(s)))
+        append(ints)
+    return result
+
+def to_column(values):
+    """A column of xlist.parse(): an ivec if it holds only ints, otherwise an xlist."""
+    if values and set(map(type, values)) == {int}:
+        return to_ivec(values)
+    return xlist(values)
+
+def to_ivec(values):
+    """An ivec of a list of ints, or an xlist if any of them doesn't fit in 64 bits."""
+    try:
+        return ivec(values)
+    except OverflowError:
+        result = xlist()
+        result.extend(values)
+        return result
+
+
+# The filename of generated wrappers, in tracebacks and profiles
+WRAPPER_FILENAME = '<aoc.types wrapper>'
+
+
+def forwarding(func):
+    """Source code for the parameter list of a method (minus self) and for the arguments that
+    pass them on unchanged, plus a namespace holding their defaults. Methods without an
+    introspectable signature fall back to *args, **kwargs."""
+    import inspect
+    try:
+        params = list(inspect.signature(func).parameters.values())[1:]
+    except (TypeError, ValueError):
+        return '*args, **kwargs', '*args, **kwargs', {}
+    decl, call, namespace = [], [], {}
+    for p in params:
+        if p.kind is p.VAR_POSITIONAL:
+            decl.append(f'*{p.name}')
+            call.append(f'*{p.name}')
+        elif p.kind is p.VAR_KEYWORD:
+            decl.append(f'**{p.name}')
+            call.append(f'**{p.name}')
+        else:
+            if p.kind is p.KEYWORD_ONLY and not any(d.startswith('*') for d in decl):
+                decl.append('*')
+            if p.default is p.empty:
+                decl.append(p.name)
+            else:
+                namespace[f'_default_{p.name}'] = p.default
+                decl.append(f'{p.name}=_default_{p.name}')
+            call.append(f'{p.name}={p.name}' if p.kind is p.KEYWORD_ONLY else p.name)
+    return ', '.join(decl), ', '.join(call), namespace
+
+def compile_method(cls, name, source, namespace):
+    """Define a method from source, which is much cheaper to call than a generic closure."""
+    exec(compile(source, WRAPPER_FILENAME, 'exec'), namespace)
+    func = namespace[name]
+    func.__qualname__ = f'{cls.__name__}.{name}'
+    return func
+
+def static_attr(cls, name):
+    """Look up a class attribute without invoking descriptors (so without building LazyMethods)."""
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            return klass.__dict__[name]
+    raise AttributeError(name)
+
+
+class LazyMethod:
+    """A placeholder for a generated method, which builds it and replaces itself with it on first
+    access, so that importing aoc.types doesn't generate every wrapper up front."""
+
+    def __init__(self, cls, name, build):
+        self.cls = cls
+        self.name = name
+        self.build = build
+
+    def __get__(self, obj, objtype=None):
+        func = self.build(self.cls, self.name)
+        setattr(self.cls, self.name, func)
+        return func.__get__(obj, objtype)
+
 
 class FixedTypeMeta(type):
     """A metaclass that monkeypatches methods to properly return its subtype."""
 
     def __new__(cls, name, bases, attrs):
         obj = super().__new__(cls, name, bases, attrs)
-        base = obj.__base__
         for meth_name in obj.__patchmethods__:
-            func = getattr(base, meth_name, None)
-            if func is None:
-                continue
-            def wrapper(self, *args, _base_func=func, **kwargs):
-                result = _base_func(self, *args, **kwargs)
-                return obj(result) if isinstance(result, base) else result
-            wrapper.__qualname__ = obj.__name__ + '.' + meth_name
-            setattr(obj, meth_name, wrapper)
+            if hasattr(obj.__base__, meth_name):
+                setattr(obj, meth_name, LazyMethod(obj, meth_name, cls.build))
         return obj
 
+    @staticmethod
+    def build(obj, meth_name):
+        # Each wrapper gets the exact signature of the method it wraps, so that calling it never
+        # packs *args/**kwargs
+        base = obj.__base__
+        func = getattr(base, meth_name)
+        decl, call, namespace = forwarding(func)
+        namespace.update(_base_func=func, _base=base, _cls=obj)
+        source = (f'def {meth_name}(self, {decl}):\n'
+                  f'    result = _base_func(self, {call})\n'
+                  f'    return _cls(result) if result.__class__ is _base else result\n')
+        return compile_method(obj, meth_name, source, namespace)
+
 
 class xstr(str, metaclass=FixedTypeMeta):
     """An extension of the built-in `str` type for concise input parsing."""
 
+    # Set to True to make .ints/.sints return compact ivecs instead of xlists
+    int_vectors = False
+
     __patchmethods__ = [
-        '__add__', '__format__', '__getitem__', '__mod__', '__mul__', '__rmul__',
+        '__add__', '__format__', '__mod__', '__mul__', '__rmul__',
         'capitalize', 'casefold', 'center', 'encode', 'expandtabs', 'format',
         'format_map', 'join', 'ljust', 'lower', 'lstrip', 'removeprefix',
         'removesuffix', 'replace', 'rjust', 'rstrip', 'strip', 'swapcase',
@@ -54,14 +207,21 @@ class xstr(str, metaclass=FixedTypeMeta):
     def splitlines(self, keepends=False):
         return xlist(super().splitlines(keepends))
 
+    def __getitem__(self, key):
+        result = str.__getitem__(self, key)
+        # Single characters are shared instead of being wrapped again every time
+        if len(result) == 1:
+            return xchars[result]
+        return xstr(result)
+
     def __iter__(self):
-        return (xstr(c) for c in super().__iter__())
+        return map(xchars.__getitem__, str.__iter__(self))
 
     """Non-standard string utility functions"""
 
-    def adj(self, k=2):
+    def adj(self, k=2, lazy=False):
         """Same as comb(k, 1)."""
-        return self.comb(k, 1)
+        return self.comb(k, 1, lazy=lazy)
 
     @property
     def b(self):
@@ -73,9 +233,11 @@ class xstr(str, metaclass=FixedTypeMeta):
         """Return a list of tokens separated each by two newlines."""
         return self.split('\n\n')
 
-    def comb(self, *args, **kwargs):
-        """Wrapper around the comb() function."""
-        return comb(self, *args, **kwargs)
+    def comb(self, size=1, step=None, partial=False, lazy=False):
+        """Wrapper around the comb() function (or icomb(), returning an xiter, with lazy=True)."""
+        if lazy:
+            return xiter(icomb(self, size, step, partial))
+        return comb(self, size, step, partial)
 
     def e(self, **locals):
         """Evaluate the string as Python code."""
@@ -98,6 +260,11 @@ class xstr(str, metaclass=FixedTypeMeta):
         """Convert a 2D grid into a 2D list of chars"""
         return xlist(map(xlist, self.lines))
 
+    @property
+    def cgrid(self):
+        """Convert a 2D grid into a compact, byte-backed Grid."""
+        return Grid.from_str(self)
+
     def gs(self, pattern, repl, count=0, flags=0):
         """Find and replace all occurrences of the specified pattern with the replacement."""
         return xstr(regex.sub(pattern, repl, self, count, flags))
@@ -105,7 +272,7 @@ class xstr(str, metaclass=FixedTypeMeta):
     @property
     def ints(self):
         """Find all *unsigned* integers matching the regex /\d+/, and cast to int()."""
-        return mint(self.gm(r'\d+'))
+        return scan_ints(self)
 
     @property
     def lc(self):
@@ -137,7 +304,7 @@ class xstr(str, metaclass=FixedTypeMeta):
     @property
     def sints(self):
         """Find all *signed* integers matching the regex /-?\d+/, and cast to int()."""
-        return mint(self.gm(r'-?\d+'))
+        return scan_ints(self, signed=True)
 
     @property
     def succ(self):
@@ -164,6 +331,17 @@ class xstr(str, metaclass=FixedTypeMeta):
         return self.gm(r'\w+')
 
 
+class CharCache(dict):
+    """Single-character xstrs, created once per distinct character."""
+
+    def __missing__(self, c):
+        x = self[c] = xstr(c)
+        return x
+
+
+xchars = CharCache()
+
+
 class VectorizedClassMeta(type):
     """Add vectorized computation to the methods of an iterable class"""
 
@@ -176,21 +354,31 @@ class VectorizedClassMeta(type):
             if not x.startswith('__')
         }
         for meth_name in __vectormethods__:
-            func = getattr(vec_class, meth_name)
+            func = static_attr(vec_class, meth_name)
             if hasattr(obj, meth_name):
                 continue
-            if callable(func):
-                def wrapper(self, *args, _base_func=func, **kwargs):
-                    return obj(_base_func(x, *args, **kwargs) for x in self)
-                wrapper.__qualname__ = obj.__name__ + '.' + meth_name
-                setattr(obj, meth_name, wrapper)
-            elif isinstance(func, property):
-                def wrapper(self, *args, _base_func=func.fget, **kwargs):
-                    return obj(_base_func(x, *args, **kwargs) for x in self)
-                wrapper.__qualname__ = obj.__name__ + '.' + meth_name
-                setattr(obj, meth_name, property(wrapper))
+            if isinstance(func, property):
+                setattr(obj, meth_name, LazyMethod(obj, meth_name, cls.build_property))
+            elif callable(func) or isinstance(func, LazyMethod):
+                setattr(obj, meth_name, LazyMethod(obj, meth_name, cls.build_method))
         return obj
 
+    @staticmethod
+    def build_method(obj, meth_name):
+        # A list comprehension calling the method directly, with the exact signature of the
+        # vectorized method; elements are dispatched on their own type, so nested lists work
+        decl, call, namespace = forwarding(getattr(obj.__vectorclass__, meth_name))
+        namespace['_cls'] = obj
+        source = (f'def {meth_name}(self, {decl}):\n'
+                  f'    return _cls([_item.{meth_name}({call}) for _item in self])\n')
+        return compile_method(obj, meth_name, source, namespace)
+
+    @staticmethod
+    def build_property(obj, meth_name):
+        source = (f'def {meth_name}(self):\n'
+                  f'    return _cls([_item.{meth_name} for _item in self])\n')
+        return property(compile_method(obj, meth_name, source, {'_cls': obj}))
+
 
 class xlist(list, metaclass=VectorizedClassMeta):
     """An extension of the built-in `list` type for concise input parsing."""
@@ -199,8 +387,14 @@ class xlist(list, metaclass=VectorizedClassMeta):
     __vectormethods__ = []
 
     def __init__(self, iterable=()):
-        iterable = (xstr(i) if isinstance(i, str) else i for i in iterable)
-        return super().__init__(iterable)
+        super().__init__(iterable)
+        # Only plain strs need wrapping, so skip the per-element pass when there are none
+        types = set(map(type, self))
+        if str in types:
+            if len(types) == 1:
+                self[:] = map(xstr, self)
+            else:
+                self[:] = [xstr(x) if x.__class__ is str else x for x in self]
 
     def __add__(self, other):
         if isinstance(other, list):
@@ -215,29 +409,36 @@ class xlist(list, metaclass=VectorizedClassMeta):
     __radd__ = __add__
     __rmul__ = __mul__
 
-    def adj(self, k=2):
+    def adj(self, k=2, lazy=False):
         """Same as comb(k, 1)."""
-        return self.comb(k, 1)
+        return self.comb(k, 1, lazy=lazy)
 
-    def comb(self, size=1, step=None, partial=False):
-        """Wrapper around the comb() function."""
+    def comb(self, size=1, step=None, partial=False, lazy=False):
+        """Wrapper around the comb() function (or icomb(), returning an xiter, with lazy=True)."""
+        if lazy:
+            return xiter(icomb(self, size, step, partial))
         return xlist(comb(self, size, step, partial))
 
     def j(self, sep=''):
         """Join a list by a separator."""
         return xstr(sep).join(map(xstr, self))
 
+    def lazy(self):
+        """Return an xiter over the list, so that chained vectorized calls are fused."""
+        return xiter(self)
+
     def reduce(self, func, default=None):
         if len(self) == 0:
             return self
         if default is None:
-            result = self[0]
-            for x in self[1:]:
-                result = func(result, x)
-        else:
-            result = default
-            for x in self:
-                result = func(result, x)
+            return reduce(func, self)
+        return reduce(func, self, default)
+
+    @property
+    def ints(self):
+        """Per-element xstr.ints, without building an intermediate xlist of xstrs per element."""
+        result = xlist()
+        result.extend(scan_ints_each(self))
         return result
 
     @property
@@ -248,12 +449,255 @@ class xlist(list, metaclass=VectorizedClassMeta):
     def min(self):
         return min(self)
 
+    def parse(self, format, search=False):
+        """Parse every element with one format (anchored, unlike .p, unless search=True).
+
+        Returns a tuple of columns, one per positional field and then one per named field, in
+        order; columns of ints are ivecs. Raises ValueError if an element doesn't match.
+        """
+        parser = compile_format(format)
+        # Straight to the compiled regex and the field conversions, without a Result per element.
+        # These are parse internals, so fall back to its public API if they ever go away
+        try:
+            regex = parser._search_re if search else parser._match_re
+            fixed_fields, named_fields = parser._fixed_fields, parser._named_fields
+            conversions = parser._type_conversions
+            int_convert = _parse.int_convert
+        except AttributeError:
+            return self.parse_results(parser, format, search)
+        matches = list(map(regex.search if search else regex.match, self))
+        if None in matches:
+            i = matches.index(None)
+            raise ValueError(f'element {i} does not match {format!r}: {self[i]!r}')
+        groups = [m.groups() for m in matches]
+        fields = [(n, n) for n in fixed_fields]
+        fields += [(regex.groupindex[k] - 1, k) for k in named_fields]
+        columns = []
+        for index, key in fields:
+            column = [g[index] for g in groups]
+            convert = conversions.get(key)
+            if type(convert) is int_convert and getattr(convert, 'base', 0) is None:
+                # {:d} fields are almost always plain decimals, which int() converts at C speed
+                try:
+                    column = list(map(int, column))
+                except ValueError:
+                    column = [convert(x, m) for x, m in zip(column, matches)]
+            elif convert is not None:
+                column = [convert(x, m) for x, m in zip(column, matches)]
+            columns.append(to_column(column))
+        return tuple(columns)
+
+    def parse_results(self, parser, format, search):
+        """The slow path of parse(), through one parse.Result per element."""
+        results = [parser.search(x) if search else parser.parse(x) for x in self]
+        if None in results:
+            i = results.index(None)
+            raise ValueError(f'element {i} does not match {format!r}: {self[i]!r}')
+        columns = [[r.fixed[i] for r in results] for i in range(len(parser.fixed_fields))]
+        columns += [[r.named[k] for r in results] for k in parser.named_fields]
+        return tuple(map(to_column, columns))
+
+    @property
+    def sints(self):
+        """Per-element xstr.sints, without building an intermediate xlist of xstrs per element."""
+        result = xlist()
+        result.extend(scan_ints_each(self, signed=True))
+        return result
+
     @property
     def sum(self):
         if len(self) == 0:
             return self
-        result = self[0]
-        for x in self[1:]:
+        it = iter(self)
+        result = next(it)
+        for x in it:
+            result += x
+        return result
+
+
+def elementwise(op):
+    def method(self, other):
+        if isinstance(other, int):
+            values = list(map(op, self, repeat(other)))
+        else:
+            if len(other) != len(self):
+                raise ValueError(f'length mismatch: {len(self)} != {len(other)}')
+            values = list(map(op, self, other))
+        return to_ivec(values)
+    method.__name__ = f'__{op.__name__}__'
+    return method
+
+def elementwise_r(op):
+    def method(self, other):
+        if not isinstance(other, int):
+            return NotImplemented
+        return to_ivec(list(map(op, repeat(other), self)))
+    method.__name__ = f'__r{op.__name__}__'
+    return method
+
+
+class ivec(array):
+    """A compact vector of 64-bit signed ints, backed by array('q').
+
+    Arithmetic is elementwise, with either a scalar or a sequence of the same length (unlike
+    xlist, where + concatenates). Results that overflow 64 bits fall back to an xlist.
+    """
+
+    def __new__(cls, iterable=()):
+        return super().__new__(cls, 'q', iterable)
+
+    def __repr__(self):
+        return f'ivec({self.tolist()})'
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return ivec(super().__getitem__(i))
+        return super().__getitem__(i)
+
+    def copy(self):
+        return ivec(self)
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        return ivec(self)
+
+    def __reduce_ex__(self, protocol):
+        # array's own reduce would call ivec('q', items), and __new__ only takes the items
+        return ivec, (self.tolist(),)
+
+    def view(self, start=None, stop=None, step=None):
+        """A zero-copy memoryview of a slice (the ivec can't be resized while views exist)."""
+        return memoryview(self)[start:stop:step]
+
+    __add__ = elementwise(operator.add)
+    __sub__ = elementwise(operator.sub)
+    __mul__ = elementwise(operator.mul)
+    __floordiv__ = elementwise(operator.floordiv)
+    __mod__ = elementwise(operator.mod)
+    __radd__ = elementwise_r(operator.add)
+    __rsub__ = elementwise_r(operator.sub)
+    __rmul__ = elementwise_r(operator.mul)
+    __rfloordiv__ = elementwise_r(operator.floordiv)
+    __rmod__ = elementwise_r(operator.mod)
+    # The in-place forms of array would otherwise concatenate/repeat
+    __iadd__, __isub__, __imul__ = __add__, __sub__, __mul__
+
+    def __neg__(self):
+        return to_ivec(list(map(operator.neg, self)))
+
+    def __abs__(self):
+        return to_ivec(list(map(abs, self)))
+
+    def prefix(self, initial=None):
+        """Prefix sums, optionally starting with initial (making the result one longer)."""
+        return to_ivec(list(accumulate(self, initial=initial)))
+
+    def sort(self, reverse=False):
+        """Sort the vector in place."""
+        self[:] = array('q', sorted(self, reverse=reverse))
+
+    def j(self, sep=''):
+        """Join the numbers by a separator."""
+        return xstr(sep).join(map(str, self))
+
+    def reduce(self, func, default=None):
+        if len(self) == 0:
+            return self
+        if default is None:
+            return reduce(func, self)
+        return reduce(func, self, default)
+
+    @property
+    def max(self):
+        return max(self)
+
+    @property
+    def min(self):
+        return min(self)
+
+    @property
+    def sum(self):
+        return sum(self)
+
+
+class LazyVectorizedClassMeta(type):
+    """Add lazy vectorized computation to the methods of an iterator class"""
+
+    def __new__(cls, name, bases, attrs):
+        obj = super().__new__(cls, name, bases, attrs)
+        vec_class = obj.__vectorclass__
+        for meth_name in dir(vec_class):
+            if meth_name.startswith('__') or hasattr(obj, meth_name):
+                continue
+            func = static_attr(vec_class, meth_name)
+            # Each call only stacks another map() stage; elements are dispatched on their own
+            # type, so nested xlists (e.g. after .split()) keep their vectorized behaviour
+            if callable(func) or isinstance(func, LazyMethod):
+                def wrapper(self, *args, _meth_name=meth_name, **kwargs):
+                    return obj(map(methodcaller(_meth_name, *args, **kwargs), self))
+                wrapper.__qualname__ = obj.__name__ + '.' + meth_name
+                setattr(obj, meth_name, wrapper)
+            elif isinstance(func, property):
+                def wrapper(self, _getter=attrgetter(meth_name)):
+                    return obj(map(_getter, self))
+                wrapper.__qualname__ = obj.__name__ + '.' + meth_name
+                setattr(obj, meth_name, property(wrapper))
+        return obj
+
+
+class xiter(metaclass=LazyVectorizedClassMeta):
+    """A lazy, single-use counterpart of `xlist`.
+
+    Vectorized calls such as `_L.lazy().strip().split(',').ints` are only recorded, and the
+    whole chain runs once per element when a terminal operation (iteration, .sum, .max,
+    .collect(), ...) consumes the iterator. No intermediate lists are allocated.
+    """
+
+    __vectorclass__ = xstr
+
+    def __init__(self, iterable=()):
+        self._it = iter(iterable)
+
+    def __iter__(self):
+        return self._it
+
+    def __next__(self):
+        return next(self._it)
+
+    def collect(self):
+        """Materialize the pipeline into an xlist."""
+        return xlist(self)
+
+    def j(self, sep=''):
+        """Join the results by a separator."""
+        return xstr(sep).join(map(xstr, self))
+
+    def reduce(self, func, default=None):
+        # Like xlist.reduce, an empty input reduces to an empty xlist
+        for first in self:
+            break
+        else:
+            return xlist()
+        if default is None:
+            return reduce(func, self, first)
+        return reduce(func, self, func(default, first))
+
+    @property
+    def max(self):
+        return max(self)
+
+    @property
+    def min(self):
+        return min(self)
+
+    @property
+    def sum(self):
+        it = iter(self)
+        result = next(it, None)
+        if result is None:
+            return xlist()
+        for x in it:
             result += x
         return result
 
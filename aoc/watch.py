@@ -0,0 +1,100 @@
+from aoc.bench import exec_script
+import ctypes
+import os
+import re
+import select
+import struct
+import sys
+import time
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+
+
+class Watcher:
+    """Waits for a file to be saved, through inotify on Linux, or by polling its mtime.
+
+    inotify watches the file's directory rather than the file itself, since many editors save by
+    writing a new file and renaming it over the old one.
+    """
+
+    def __init__(self, path, interval=0.05, poll=False):
+        self.path = path
+        self.interval = interval
+        self.fd = None if poll else self.open_inotify()
+        self.mtime = self.stat()
+
+    def open_inotify(self):
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(dirname), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    @property
+    def method(self):
+        return 'polling' if self.fd is None else 'inotify'
+
+    def stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def wait(self):
+        """Block until the file has been saved again (coalescing bursts of events)."""
+        if self.fd is None:
+            while (mtime := self.stat()) == self.mtime or mtime is None:
+                time.sleep(self.interval)
+            self.mtime = mtime
+            return
+        name = os.fsencode(os.path.basename(self.path))
+        while True:
+            select.select([self.fd], [], [])
+            if name in self.read_events():
+                return
+
+    def read_events(self):
+        """Read every pending event without blocking, returning the names of the files touched."""
+        names = set()
+        while select.select([self.fd], [], [], 0)[0]:
+            buf = os.read(self.fd, 1 << 16)
+            i = 0
+            while i < len(buf):
+                _, _, _, length = struct.unpack_from('iIII', buf, i)
+                i += 16
+                names.add(buf[i:i + length].rstrip(b'\0'))
+                i += length
+        return names
+
+
+def preload(script):
+    """Warm up this process for running the script: imports, and its input if it is cached."""
+    import aoc
+    from aoc.api import default_store
+    with open(script) as f:
+        source = f.read()
+    m = re.search(r'template\.exec\(\s*(\d+)\s*,\s*(\d+)', source)
+    if m is not None:
+        default_store.get(int(m[1]), int(m[2]))
+
+
+def run_forked(script, argv):
+    """Run the script in a forked child of this process, returning (exit code, seconds)."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        exec_script(script, argv)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status), time.perf_counter() - start
@@ -4,6 +4,9 @@ setup(
     name='aoc-tools',
     description='my aoc tooling',
     packages=find_packages(),
+    extras_require={
+        'numpy': ['numpy'],
+    },
     entry_points={
         'console_scripts': ['aoc=aoc.cli:main'],
     },